@@ -0,0 +1,858 @@
+"""
+Benchmarks do sistema bancário (desafio_v5).
+
+Uso:
+    python benchmark_v5.py <cenario> [opções]
+
+Execute `python benchmark_v5.py -h` para ver os cenários disponíveis.
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import json
+import os
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import tempfile
+import textwrap
+import time
+import tracemalloc
+from array import array
+
+import desafio_v5 as banco
+
+
+# ============ Utilitários ============
+def cronometrar(func, repeticoes):
+    """
+    Executa `func` `repeticoes` vezes e retorna o tempo médio por chamada,
+    em nanossegundos.
+    """
+    inicio = time.perf_counter_ns()
+    for _ in range(repeticoes):
+        func()
+    return (time.perf_counter_ns() - inicio) / repeticoes
+
+
+def gerar_cpf(indice):
+    return f"{indice:011d}"
+
+
+# ============ Cenário: busca de clientes por CPF ============
+def bench_busca_clientes(args):
+    print(f"{'clientes':>10} | {'lista (ns)':>12} | {'registro (ns)':>14}")
+    for total in args.tamanhos:
+        clientes = [
+            banco.PessoaFisica(nome=f"Cliente {i}", data_nascimento="01-01-1990", cpf=gerar_cpf(i), endereco="-")
+            for i in range(total)
+        ]
+        registro = banco.ClienteRegistry(clientes)
+        cpfs = [gerar_cpf(random.randrange(total)) for _ in range(args.buscas)]
+        iterador = itertools.cycle(cpfs)
+
+        # A busca linear só é medida até 100k clientes, acima disso ela leva minutos
+        if total <= 100_000:
+            repeticoes_lista = max(1, min(args.buscas, 10_000_000 // total))
+            tempo_lista = f"{cronometrar(lambda: banco.filtrar_cliente(next(iterador), clientes), repeticoes_lista):12.0f}"
+        else:
+            tempo_lista = f"{'-':>12}"
+        tempo_registro = cronometrar(lambda: banco.filtrar_cliente(next(iterador), registro), args.buscas)
+        print(f"{total:>10} | {tempo_lista} | {tempo_registro:14.0f}")
+
+
+# ============ Cenário: memória do Histórico ============
+def medir_memoria(construir):
+    """
+    Retorna (objeto, bytes alocados) para o objeto criado por `construir`,
+    medidos com tracemalloc.
+    """
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        objeto = construir()
+        depois = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return objeto, depois - antes
+
+
+def bench_memoria_historico(args):
+    total = args.transacoes
+    base = banco.para_microssegundos(banco.datetime.now())
+
+    def historico_dicionarios():
+        # Formato anterior: um dicionário por transação
+        return [
+            {"tipo": "Deposito", "valor": float(10 + i % 100), "data": base + i}
+            for i in range(total)
+        ]
+
+    def historico_colunar():
+        historico = banco.Historico()
+        for i in range(total):
+            historico.adicionar_transacao(banco.Deposito((10 + i % 100) * 100))
+        return historico
+
+    _, bytes_antes = medir_memoria(historico_dicionarios)
+    _, bytes_depois = medir_memoria(historico_colunar)
+    print(f"transações: {total}")
+    print(f"dicionários: {bytes_antes / total:8.1f} bytes/transação")
+    print(f"colunar:     {bytes_depois / total:8.1f} bytes/transação")
+
+
+# ============ Cenário: memória por objeto do domínio ============
+def bench_memoria_objetos(args):
+    cliente_base = banco.PessoaFisica(nome="Cliente", data_nascimento="01-01-1990", cpf=gerar_cpf(0), endereco="-")
+    for total in args.tamanhos:
+        print(f"\n--- {total} contas ---")
+        medidas = {
+            "PessoaFisica": lambda: [
+                banco.PessoaFisica(nome="Cliente", data_nascimento="01-01-1990", cpf=gerar_cpf(i), endereco="-")
+                for i in range(total)
+            ],
+            "ContaCorrente": lambda: [
+                banco.ContaCorrente.nova_conta(cliente=cliente_base, numero=i, limite=50_000, limite_saques=3)
+                for i in range(total)
+            ],
+            "Historico (vazio)": lambda: [banco.Historico() for _ in range(total)],
+            "Deposito": lambda: [banco.Deposito(1_000) for _ in range(total)],
+        }
+        for nome, construir in medidas.items():
+            _, bytes_total = medir_memoria(construir)
+            # Desconta os 8 bytes por item da lista que guarda os objetos
+            print(f"{nome:<20} {bytes_total / total - 8:8.1f} bytes/objeto")
+
+        def contas_com_clientes():
+            contas = []
+            for i in range(total):
+                cliente = banco.PessoaFisica(nome="Cliente", data_nascimento="01-01-1990", cpf=gerar_cpf(i), endereco="-")
+                conta = banco.ContaCorrente.nova_conta(cliente=cliente, numero=i, limite=50_000, limite_saques=3)
+                cliente.adicionar_conta(conta)
+                contas.append(conta)
+            return contas
+
+        _, bytes_total = medir_memoria(contas_com_clientes)
+        print(f"{'conta + cliente':<20} {bytes_total / total:8.1f} bytes/conta ({bytes_total / 2**20:.1f} MiB no total)")
+
+
+# ============ Cenário: custo do decorador de log ============
+def bench_log(args):
+    @banco.log_transacao
+    def operacao(valor):
+        return valor
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "log.txt")
+        escritores = {
+            "síncrono": lambda: banco.EscritorLogSincrono(caminho),
+            "assíncrono (pelo menos uma vez)": lambda: banco.EscritorLogAssincrono(
+                caminho, entrega=banco.ENTREGA_PELO_MENOS_UMA_VEZ
+            ),
+            "assíncrono (melhor esforço)": lambda: banco.EscritorLogAssincrono(
+                caminho, entrega=banco.ENTREGA_MELHOR_ESFORCO
+            ),
+        }
+        for nome, criar in escritores.items():
+            banco.configurar_log(criar())
+            tempo = cronometrar(lambda: operacao(42), args.chamadas)
+            inicio = time.perf_counter()
+            banco.encerrar_log()
+            drenagem = time.perf_counter() - inicio
+            print(f"{nome:<32} {tempo / 1000:8.2f} µs/chamada (drenagem final: {drenagem * 1000:.0f} ms)")
+        banco.configurar_log(None)
+
+
+# ============ Cenário: log completo x log estruturado ============
+def bench_log_estruturado(args):
+    @banco.log_transacao
+    def operacao_completa(clientes):
+        return None
+
+    @banco.log_transacao(campos=("cpf", "resultado"))
+    def operacao_estruturada(clientes):
+        banco.anotar_log(cpf=gerar_cpf(1), resultado="sucesso")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "log.txt")
+        print(f"{'clientes':>10} | {'completo (µs)':>14} | {'estruturado (µs)':>17}")
+        for total in args.tamanhos:
+            clientes = [
+                banco.PessoaFisica(nome="Cliente", data_nascimento="01-01-1990", cpf=gerar_cpf(i), endereco="-")
+                for i in range(total)
+            ]
+            tempos = []
+            for operacao in (operacao_completa, operacao_estruturada):
+                # Escritor síncrono: mede também o custo de formatar e gravar a entrada
+                banco.configurar_log(banco.EscritorLogSincrono(caminho))
+                tempos.append(cronometrar(lambda: operacao(clientes), args.chamadas))
+            print(f"{total:>10} | {tempos[0] / 1000:14.1f} | {tempos[1] / 1000:17.1f}")
+        banco.configurar_log(None)
+
+
+# ============ Cenário: diário e recuperação ============
+def bench_persistencia(args):
+    total_contas, total_transacoes = args.contas, args.transacoes
+    por_conta = max(1, total_transacoes // total_contas)
+    codigo_deposito = banco.codigo_tipo_transacao("Deposito")
+    base = banco.para_microssegundos(banco.datetime(2024, 1, 1))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        diario, clientes, contas = banco.DiarioBancario.recuperar(pasta, gravar_a_cada=args.gravar_a_cada)
+        banco.configurar_diario(diario)
+
+        inicio = time.perf_counter()
+        for i in range(total_contas):
+            cliente = banco.PessoaFisica(nome=f"Cliente {i}", data_nascimento="01-01-1990", cpf=gerar_cpf(i), endereco="-")
+            clientes.adicionar(cliente)
+            conta = banco.ContaCorrente.nova_conta(cliente=cliente, numero=i + 1, limite=50_000, limite_saques=3)
+            cliente.adicionar_conta(conta)
+            contas.append(conta)
+        tempo_cadastro = time.perf_counter() - inicio
+        print(f"cadastro de {total_contas} contas (com diário): {tempo_cadastro:.2f} s")
+
+        # Histórico sintético, montado direto nas colunas (não passa pelo diário)
+        for indice, conta in enumerate(contas):
+            inicio_conta = base + indice * por_conta
+            conta.historico._restaurar(
+                array("B", [codigo_deposito]) * por_conta,
+                array("q", [1_000]) * por_conta,
+                array("q", range(inicio_conta, inicio_conta + por_conta)),
+            )
+            conta._saldo = por_conta * 1_000
+
+        inicio = time.perf_counter()
+        diario.gravar_snapshot()
+        tempo_snapshot = time.perf_counter() - inicio
+        tamanho = os.path.getsize(os.path.join(pasta, "snapshot.pkl"))
+        print(f"snapshot com {por_conta * total_contas} transações: {tempo_snapshot:.2f} s ({tamanho / 2**20:.0f} MiB)")
+
+        # Vazão do diário: eventos de transação anexados após o snapshot
+        deposito = banco.Deposito(1_000)
+        inicio = time.perf_counter()
+        for i in range(args.cauda):
+            conta = contas[i % total_contas]
+            conta._saldo += 1_000
+            conta.historico.adicionar_transacao(deposito)
+            diario.registrar_transacao(conta)
+        diario.sincronizar()
+        tempo_diario = time.perf_counter() - inicio
+        print(f"diário: {args.cauda / tempo_diario:,.0f} eventos/s (gravar_a_cada={args.gravar_a_cada})")
+        diario.fechar()
+        banco.configurar_diario(None)
+        del clientes, contas, diario
+
+        inicio = time.perf_counter()
+        diario, clientes, contas = banco.DiarioBancario.recuperar(pasta)
+        tempo_recuperacao = time.perf_counter() - inicio
+        diario.fechar()
+        print(f"recuperação (snapshot + {args.cauda} eventos do diário): {tempo_recuperacao:.2f} s")
+
+
+# ============ Cenário: processamento em lote ============
+def criar_banco(total_contas, saldo_inicial=0):
+    clientes = banco.ClienteRegistry()
+    contas = banco.IndiceContas()
+    for i in range(total_contas):
+        cliente = banco.PessoaFisica(nome=f"Cliente {i}", data_nascimento="01-01-1990", cpf=gerar_cpf(i), endereco="-")
+        clientes.adicionar(cliente)
+        conta = banco.ContaCorrente.nova_conta(cliente=cliente, numero=i + 1, limite=50_000, limite_saques=3)
+        conta._saldo = saldo_inicial
+        cliente.adicionar_conta(conta)
+        contas.append(conta)
+    return clientes, contas
+
+
+def gerar_itens(total_itens, total_contas):
+    aleatorio = random.Random(42)
+    return [
+        (gerar_cpf(aleatorio.randrange(total_contas)), aleatorio.choice("ds"), aleatorio.randrange(1, 100) * 500)
+        for _ in range(total_itens)
+    ]
+
+
+def bench_lote(args):
+    itens = gerar_itens(args.itens, args.contas)
+
+    clientes, contas = criar_banco(args.contas, saldo_inicial=100_000)
+    inicio = time.perf_counter()
+    for cpf, tipo, valor in itens:
+        cliente = banco.filtrar_cliente(cpf, clientes)
+        transacao = banco.Deposito(valor) if tipo == "d" else banco.Saque(valor)
+        cliente.realizar_transacao(cliente.contas[0], transacao)
+    tempo_um_a_um = time.perf_counter() - inicio
+    saldos_um_a_um = [conta.saldo for conta in contas]
+
+    clientes, contas = criar_banco(args.contas, saldo_inicial=100_000)
+    inicio = time.perf_counter()
+    banco.processar_lote(itens, clientes, contas)
+    tempo_lote = time.perf_counter() - inicio
+
+    assert saldos_um_a_um == [conta.saldo for conta in contas], "lote divergiu do processamento um a um"
+    print(f"um a um: {args.itens / tempo_um_a_um:12,.0f} itens/s")
+    print(f"lote:    {args.itens / tempo_lote:12,.0f} itens/s")
+
+
+# ============ Cenário: importação de CSV ============
+def bench_importacao(args):
+    aleatorio = random.Random(7)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "transacoes.csv")
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write("cpf,tipo,valor\n")
+            for _ in range(args.linhas):
+                tipo = aleatorio.choice("ds")
+                f.write(f"{gerar_cpf(aleatorio.randrange(args.contas))},{tipo},{aleatorio.randrange(1, 100) * 5},00\n"
+                        if tipo == "s" else
+                        f"{gerar_cpf(aleatorio.randrange(args.contas))},{tipo},{aleatorio.randrange(100, 100_000) / 100}\n")
+
+        clientes, contas = criar_banco(args.contas, saldo_inicial=100_000)
+        rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        relatorio = banco.importar_csv(caminho, clientes, contas, tamanho_bloco=args.bloco)
+        rss_depois = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(relatorio)
+        # Inclui o crescimento dos Históricos; o arquivo em si nunca é carregado inteiro
+        print(f"crescimento do pico de memória (RSS): {(rss_depois - rss_antes) / 1024:.1f} MiB")
+
+
+# ============ Cenário: operações concorrentes ============
+def bench_concorrencia(args):
+    banco.configurar_concorrencia(not args.sem_travas)
+    # Trocas de thread bem mais frequentes, para expor condições de corrida
+    sys.setswitchinterval(1e-6)
+    clientes, contas = criar_banco(args.contas)
+    for conta in contas:
+        conta.historico.adicionar_transacao(banco.Deposito(100_000))
+        conta._saldo = 100_000
+        conta.limite_transacoes_diarias = args.operacoes # Sem limite diário no teste
+        conta._limite_saques = args.operacoes
+    saldo_inicial = sum(conta.saldo for conta in contas)
+    movimentos = [0] * args.threads
+
+    def trabalhar(indice):
+        aleatorio = random.Random(indice)
+        for _ in range(args.operacoes // args.threads):
+            conta = contas[aleatorio.randrange(len(contas))]
+            if aleatorio.random() < 0.5:
+                transacao = banco.Deposito(aleatorio.randrange(1, 20) * 500)
+            else:
+                transacao = banco.Saque(aleatorio.randrange(1, 100) * 500)
+            if transacao.registrar(conta):
+                movimentos[indice] += transacao.sinal * transacao.valor
+
+    threads = [threading.Thread(target=trabalhar, args=(i,)) for i in range(args.threads)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tempo = time.perf_counter() - inicio
+    sys.setswitchinterval(0.005)
+
+    problemas = banco.verificar_invariantes(contas)
+    saldo_esperado = saldo_inicial + sum(movimentos)
+    saldo_final = sum(conta.saldo for conta in contas)
+    if saldo_final != saldo_esperado:
+        problemas.append(
+            f"Soma dos saldos {banco.formatar_moeda(saldo_final)} difere do esperado {banco.formatar_moeda(saldo_esperado)}"
+        )
+
+    modo = "sem travas" if args.sem_travas else "travas por conta"
+    print(f"{modo}: {args.threads} threads, {args.operacoes / tempo:,.0f} operações/s")
+    print(f"invariantes: {'OK' if not problemas else f'{len(problemas)} violações'}")
+    for problema in problemas[:10]:
+        print(f"  {problema}")
+    banco.configurar_concorrencia(False)
+
+
+# ============ Cenário: motor fragmentado em vários processos ============
+def bench_fragmentado(args):
+    aleatorio = random.Random(3)
+    chaves = [(banco.AGENCIA_PADRAO, numero) for numero in range(1, args.contas + 1)]
+    depositos_iniciais = [(chave, "d", 100_000) for chave in chaves]
+    itens = [
+        (chaves[aleatorio.randrange(args.contas)], aleatorio.choice("ds"), aleatorio.randrange(1, 100) * 500)
+        for _ in range(args.itens)
+    ]
+    print(f"CPUs disponíveis: {os.cpu_count()}")
+    print(f"{'fragmentos':>10} | {'itens/s':>12} | {'aceleração':>10}")
+
+    referencia = None
+    vazao_um = None
+    for fragmentos in range(1, args.fragmentos + 1):
+        with banco.MotorFragmentado(fragmentos) as motor:
+            motor.criar_contas(
+                ((gerar_cpf(numero), f"Cliente {numero}", numero) for _, numero in chaves),
+                limite_transacoes_diarias=args.itens, # Sem limite diário no teste
+            )
+            motor.processar(depositos_iniciais)
+            inicio = time.perf_counter()
+            for posicao in range(0, args.itens, args.lote):
+                motor.processar(itens[posicao:posicao + args.lote])
+            tempo = time.perf_counter() - inicio
+            saldos = motor.saldos()
+
+        # O resultado não pode depender do número de fragmentos
+        if referencia is None:
+            referencia = saldos
+        assert saldos == referencia, f"saldos divergiram com {fragmentos} fragmentos"
+        vazao = args.itens / tempo
+        vazao_um = vazao_um or vazao
+        print(f"{fragmentos:>10} | {vazao:12,.0f} | {vazao / vazao_um:9.2f}x")
+
+
+# ============ Cenário: agregação de valores ============
+def bench_agregacao(args):
+    total = args.linhas
+    aleatorio = random.Random(11)
+    codigos = [banco.codigo_tipo_transacao("Deposito"), banco.codigo_tipo_transacao("Saque")]
+    centavos = array("q", (aleatorio.randrange(1, 1_000_000) for _ in range(total)))
+    tipos = array("B", (aleatorio.choice(codigos) for _ in range(total)))
+    historico = banco.Historico()
+    historico._restaurar(tipos, centavos, array("q", range(total)))
+
+    # Formato anterior: valores em reais (float) e o tipo por linha
+    reais = [valor / 100 for valor in centavos]
+    nomes = [banco.NOMES_TIPO_TRANSACAO[codigo] for codigo in tipos]
+
+    def medir(func):
+        inicio = time.perf_counter()
+        resultado = func()
+        return resultado, time.perf_counter() - inicio
+
+    total_float, tempo_float = medir(lambda: sum(reais))
+    total_centavos, tempo_centavos = medir(historico.total)
+    saques_float, tempo_saques_float = medir(lambda: sum(v for v, nome in zip(reais, nomes) if nome == "Saque"))
+    saques_centavos, tempo_saques_centavos = medir(lambda: historico.total("Saque"))
+
+    print(f"linhas: {total:,}")
+    print(f"{'soma':<18} | {'float (s)':>10} | {'centavos (s)':>12}")
+    print(f"{'total':<18} | {tempo_float:10.3f} | {tempo_centavos:12.3f}")
+    print(f"{'só saques':<18} | {tempo_saques_float:10.3f} | {tempo_saques_centavos:12.3f}")
+    # A soma em float acumula erro de arredondamento; a de centavos é exata
+    print(f"diferença float x exato: {abs(round(total_float * 100) - total_centavos)} centavos no total, "
+          f"{abs(round(saques_float * 100) - saques_centavos)} nos saques")
+
+
+# ============ Cenário: extrato paginado ============
+def historico_sintetico(total, inicio_datas=None):
+    # Histórico de `total` depósitos, uma transação por segundo, montado direto nas colunas
+    inicio_datas = inicio_datas or banco.para_microssegundos(banco.datetime(2024, 1, 1))
+    historico = banco.Historico()
+    historico._restaurar(
+        array("B", [banco.codigo_tipo_transacao("Deposito")]) * total,
+        array("q", (1_000 + i % 100 for i in range(total))),
+        array("q", range(inicio_datas, inicio_datas + total * 1_000_000, 1_000_000)),
+    )
+    return historico
+
+
+def bench_extrato(args):
+    cache = banco.CacheExtrato(max_bytes=args.cache_mib * 2**20)
+    banco.configurar_cache_extrato(cache)
+    print(f"{'transações':>11} | {'concatenado (ms)':>16} | {'1ª página (ms)':>14} | "
+          f"{'todas as páginas (ms)':>21} | {'de novo (ms)':>12} | {'+100 novas (ms)':>15}")
+    for total in args.tamanhos:
+        historico = historico_sintetico(total)
+
+        def concatenado():
+            # Forma anterior de exibir_extrato: o extrato inteiro numa string
+            extrato = ""
+            for transacao in historico.gerar_relatorio():
+                extrato += banco.formatar_transacao(transacao)
+            return extrato
+
+        inicio = time.perf_counter()
+        concatenado()
+        tempo_concatenado = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        next(banco.paginas_extrato(historico))
+        tempo_primeira = time.perf_counter() - inicio
+
+        def todas_as_paginas():
+            inicio = time.perf_counter()
+            for _ in banco.paginas_extrato(historico):
+                pass
+            return time.perf_counter() - inicio
+
+        tempo_todas = todas_as_paginas()
+        tempo_repetido = todas_as_paginas() # Linhas já no cache
+        for _ in range(100):
+            historico.adicionar_transacao(banco.Deposito(1_000))
+        tempo_novas = todas_as_paginas() # Só as 100 novas são formatadas
+        print(f"{total:>11,} | {tempo_concatenado * 1000:16.1f} | {tempo_primeira * 1000:14.3f} | "
+              f"{tempo_todas * 1000:21.1f} | {tempo_repetido * 1000:12.1f} | {tempo_novas * 1000:15.1f}")
+    print(cache)
+    print(cache.estatisticas())
+
+
+# ============ Cenário: relatório filtrado por tipo ============
+def bench_relatorio_tipo(args):
+    aleatorio = random.Random(5)
+    codigo_deposito = banco.codigo_tipo_transacao("Deposito")
+    codigo_saque = banco.codigo_tipo_transacao("Saque")
+    print(f"{'transações':>11} | {'saques':>8} | {'varredura (ms)':>14} | {'1ª consulta (ms)':>16} | {'seguintes (ms)':>14}")
+    for total in args.tamanhos:
+        historico = banco.Historico()
+        historico._restaurar(
+            array("B", (codigo_saque if aleatorio.random() < args.fracao_saques else codigo_deposito
+                        for _ in range(total))),
+            array("q", [1_000]) * total,
+            array("q", range(total)),
+        )
+
+        def varredura():
+            # Forma anterior de gerar_relatorio: compara o tipo, em minúsculas, linha a linha
+            return [
+                transacao for transacao in (banco.RegistroTransacao(historico, i) for i in range(len(historico)))
+                if transacao["tipo"].lower() == "saque".lower()
+            ]
+
+        def indice():
+            return list(historico.gerar_relatorio("saque"))
+
+        inicio = time.perf_counter()
+        saques = varredura()
+        tempo_varredura = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        assert len(indice()) == len(saques)
+        tempo_primeira = time.perf_counter() - inicio # Inclui a criação do índice
+        inicio = time.perf_counter()
+        indice()
+        tempo_seguinte = time.perf_counter() - inicio
+        print(f"{total:>11,} | {len(saques):>8,} | {tempo_varredura * 1000:14.1f} | "
+              f"{tempo_primeira * 1000:16.1f} | {tempo_seguinte * 1000:14.1f}")
+
+
+# ============ Cenário: saldo em um instante passado ============
+def bench_saldo_historico(args):
+    aleatorio = random.Random(9)
+    print(f"{'transações':>11} | {'reprocessar (ms)':>16} | {'1ª consulta (ms)':>16} | {'seguintes (µs)':>14}")
+    for total in args.tamanhos:
+        historico = historico_sintetico(total)
+        datas = historico._datas
+        instantes = [datas[aleatorio.randrange(total)] for _ in range(args.consultas)]
+
+        def reprocessar(instante):
+            # Sem marcos: soma o Histórico inteiro até o instante
+            saldo = 0
+            for transacao in historico.gerar_relatorio():
+                if transacao["data"] >= instante:
+                    break
+                saldo += banco.classe_transacao(transacao["tipo"]).sinal * transacao["valor"]
+            return saldo
+
+        inicio = time.perf_counter()
+        esperado = reprocessar(instantes[0])
+        tempo_reprocessar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        assert historico.saldo_em(instantes[0]) == esperado
+        tempo_primeira = time.perf_counter() - inicio # Inclui a criação dos marcos
+        inicio = time.perf_counter()
+        for instante in instantes:
+            historico.saldo_em(instante)
+        tempo_seguintes = (time.perf_counter() - inicio) / len(instantes)
+        print(f"{total:>11,} | {tempo_reprocessar * 1000:16.1f} | {tempo_primeira * 1000:16.1f} | {tempo_seguintes * 1e6:14.1f}")
+
+
+# ============ Cenário: listagem de contas ============
+def bench_listagem(args):
+    _, contas = criar_banco(args.contas)
+    for indice, conta in enumerate(contas):
+        conta._saldo = indice % 1_000 * 100
+
+    with open(os.devnull, "w", encoding="utf-8") as saida:
+        def listagem_anterior():
+            # Forma anterior: texto indentado por conta, dedent e um print por bloco
+            for conta in contas:
+                texto = (f"            Agência:\t{conta.agencia}\n            Número:\t\t{conta.numero}\n"
+                         f"            Titular:\t{conta.cliente.nome}\n"
+                         f"            Saldo:\t\t{banco.formatar_moeda(conta.saldo)}\n        ")
+                print(textwrap.dedent(texto), file=saida)
+                print("-" * 50, file=saida)
+
+        def medir(func):
+            inicio = time.perf_counter()
+            func()
+            return time.perf_counter() - inicio
+
+        paginas = lambda **filtros: banco.paginas_contas(contas, tamanho_pagina=args.pagina, **filtros)
+        tempos = {
+            "anterior (tudo)": medir(listagem_anterior),
+            "1ª página": medir(lambda: saida.write(str(next(paginas())))),
+            "todas as páginas": medir(lambda: [saida.write(str(pagina)) for pagina in paginas()]),
+            "1ª página, saldo >= R$ 999": medir(lambda: saida.write(str(next(paginas(saldo_minimo=99_900))))),
+        }
+    print(f"{args.contas:,} contas, páginas de {args.pagina}")
+    for nome, tempo in tempos.items():
+        print(f"{nome:<28} {tempo * 1000:10.2f} ms")
+
+
+# ============ Cenário: numeração de contas ============
+def alocar_em_processo(caminho, quantidade, tamanho_bloco):
+    alocador = banco.AlocadorNumeros(caminho, tamanho_bloco=tamanho_bloco)
+    return [alocador.proximo() for _ in range(quantidade)]
+
+
+def bench_numeracao(args):
+    por_trabalhador = args.numeros // args.trabalhadores
+    print(f"{args.trabalhadores} trabalhadores x {por_trabalhador:,} números")
+    print(f"{'modo':<10} | {'bloco':>6} | {'números/s':>12} | {'repetidos':>9}")
+    for tamanho_bloco in args.blocos:
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "numeros_conta")
+
+            # Threads de um processo dividem o mesmo alocador
+            alocador = banco.AlocadorNumeros(caminho, tamanho_bloco=tamanho_bloco)
+            listas = [[] for _ in range(args.trabalhadores)]
+
+            def trabalhar(indice):
+                listas[indice].extend(alocador.proximo() for _ in range(por_trabalhador))
+
+            threads = [threading.Thread(target=trabalhar, args=(i,)) for i in range(args.trabalhadores)]
+            inicio = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            tempos = {"threads": (time.perf_counter() - inicio, [n for lista in listas for n in lista])}
+
+            # Processos independentes, cada um com o seu alocador sobre o mesmo arquivo
+            contexto = multiprocessing.get_context("spawn")
+            with contexto.Pool(args.trabalhadores) as pool:
+                inicio = time.perf_counter()
+                listas = pool.starmap(alocar_em_processo, [(caminho, por_trabalhador, tamanho_bloco)] * args.trabalhadores)
+                tempos["processos"] = (time.perf_counter() - inicio, [n for lista in listas for n in lista])
+
+            for modo, (tempo, numeros) in tempos.items():
+                repetidos = len(numeros) - len(set(numeros))
+                print(f"{modo:<10} | {tamanho_bloco:>6} | {len(numeros) / tempo:12,.0f} | {repetidos:>9}")
+
+
+# ============ Cenário: índice de contas ============
+def bench_indice_contas(args):
+    print(f"{'contas':>11} | {'varredura (µs)':>14} | {'buscar (µs)':>11} | {'buscar_varios (µs)':>18}")
+    for total in args.tamanhos:
+        _, contas = criar_banco(total)
+        lista = list(contas)
+        aleatorio = random.Random(42)
+        chaves = [(banco.AGENCIA_PADRAO, aleatorio.randrange(1, total + 1)) for _ in range(args.buscas)]
+
+        # Forma anterior: sem índice, só percorrendo a lista global de contas
+        amostra = chaves[:max(1, min(len(chaves), 10_000_000 // total))]
+        inicio = time.perf_counter()
+        for agencia, numero in amostra:
+            next(conta for conta in lista if conta.agencia == agencia and conta.numero == numero)
+        tempo_varredura = (time.perf_counter() - inicio) / len(amostra)
+
+        inicio = time.perf_counter()
+        for agencia, numero in chaves:
+            contas.buscar(agencia, numero)
+        tempo_buscar = (time.perf_counter() - inicio) / len(chaves)
+
+        inicio = time.perf_counter()
+        encontradas = contas.buscar_varios(chaves)
+        tempo_varios = (time.perf_counter() - inicio) / len(chaves)
+        assert None not in encontradas
+        print(f"{total:>11,} | {tempo_varredura * 1e6:14.1f} | {tempo_buscar * 1e6:11.3f} | {tempo_varios * 1e6:18.3f}")
+
+
+# ============ Cenário: servidor asyncio sob carga ============
+def percentil(amostras_ordenadas, fracao):
+    return amostras_ordenadas[min(len(amostras_ordenadas) - 1, int(fracao * len(amostras_ordenadas)))]
+
+
+async def conectar(endereco, tentativas=100):
+    # Espera o servidor subir, tentando de novo por alguns segundos
+    for _ in range(tentativas):
+        try:
+            if isinstance(endereco, str):
+                return await asyncio.open_unix_connection(endereco)
+            return await asyncio.open_connection(*endereco)
+        except (ConnectionError, FileNotFoundError):
+            await asyncio.sleep(0.05)
+    raise ConnectionError(f"servidor não respondeu em {endereco}")
+
+
+async def pedir(leitor, escritor, comando):
+    escritor.write(json.dumps(comando).encode() + b"\n")
+    await escritor.drain()
+    return json.loads(await leitor.readline())
+
+
+async def carga_servidor(endereco, args):
+    leitor, escritor = await conectar(endereco)
+    for numero in range(1, args.contas + 1):
+        await pedir(leitor, escritor, {"op": "nu", "cpf": gerar_cpf(numero), "nome": f"Cliente {numero}"})
+        resposta = await pedir(leitor, escritor, {"op": "nc", "cpf": gerar_cpf(numero)})
+        await pedir(leitor, escritor, {"op": "d", "conta": resposta["numero"], "valor": 1_000})
+    escritor.close()
+
+    latencias = []
+    recusas = 0
+
+    async def cliente(indice):
+        nonlocal recusas
+        aleatorio = random.Random(indice)
+        leitor, escritor = await conectar(endereco)
+        for _ in range(args.requisicoes):
+            comando = {"op": aleatorio.choice("ds"), "conta": aleatorio.randrange(1, args.contas + 1),
+                       "valor": aleatorio.randrange(1, 20) * 5}
+            inicio = time.perf_counter_ns()
+            resposta = await pedir(leitor, escritor, comando)
+            latencias.append(time.perf_counter_ns() - inicio)
+            recusas += resposta["resultado"] != "sucesso"
+        escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(args.conexoes)))
+    tempo = time.perf_counter() - inicio
+    return sorted(latencias), recusas, tempo
+
+
+def bench_servidor(args):
+    # Milhares de conexões simultâneas precisam de mais descritores de arquivo
+    _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (maximo, maximo))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        programa = [sys.executable, os.path.abspath(banco.__file__), "--servidor"]
+        if args.tcp:
+            with socket.socket() as livre:
+                livre.bind(("127.0.0.1", 0))
+                porta = livre.getsockname()[1]
+            programa += ["--porta", str(porta)]
+            endereco = ("127.0.0.1", porta)
+        else:
+            endereco = os.path.join(pasta, "banco.sock")
+            programa += ["--unix", endereco]
+        servidor = subprocess.Popen(programa, cwd=pasta, stdout=subprocess.DEVNULL,
+                                    env={**os.environ, "BANCO_DADOS": os.path.join(pasta, "dados")})
+        try:
+            latencias, recusas, tempo = asyncio.run(carga_servidor(endereco, args))
+        finally:
+            servidor.send_signal(signal.SIGINT)
+            servidor.wait()
+
+    total = len(latencias)
+    print(f"{args.conexoes} conexões, {total:,} requisições em {tempo:.2f} s: {total / tempo:,.0f} req/s "
+          f"({recusas:,} recusadas pelas regras da conta)")
+    print(f"latência p50: {percentil(latencias, 0.50) / 1e6:.2f} ms | "
+          f"p99: {percentil(latencias, 0.99) / 1e6:.2f} ms | máx: {latencias[-1] / 1e6:.2f} ms")
+
+
+CENARIOS = {
+    "busca_clientes": bench_busca_clientes,
+    "memoria_historico": bench_memoria_historico,
+    "memoria_objetos": bench_memoria_objetos,
+    "log": bench_log,
+    "log_estruturado": bench_log_estruturado,
+    "persistencia": bench_persistencia,
+    "lote": bench_lote,
+    "importacao": bench_importacao,
+    "concorrencia": bench_concorrencia,
+    "fragmentado": bench_fragmentado,
+    "servidor": bench_servidor,
+    "agregacao": bench_agregacao,
+    "extrato": bench_extrato,
+    "relatorio_tipo": bench_relatorio_tipo,
+    "saldo_historico": bench_saldo_historico,
+    "listagem": bench_listagem,
+    "numeracao": bench_numeracao,
+    "indice_contas": bench_indice_contas,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do sistema bancário (desafio_v5).")
+    subparsers = parser.add_subparsers(dest="cenario", required=True)
+
+    busca = subparsers.add_parser("busca_clientes", help="Latência da busca de clientes por CPF.")
+    busca.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    busca.add_argument("--buscas", type=int, default=100_000)
+
+    memoria = subparsers.add_parser("memoria_historico", help="Bytes por transação no Histórico.")
+    memoria.add_argument("--transacoes", type=int, default=1_000_000)
+
+    objetos = subparsers.add_parser("memoria_objetos", help="Memória por objeto do domínio (tracemalloc).")
+    objetos.add_argument("--tamanhos", type=int, nargs="+", default=[100_000, 1_000_000])
+
+    log = subparsers.add_parser("log", help="Custo por chamada do decorador @log_transacao.")
+    log.add_argument("--chamadas", type=int, default=50_000)
+
+    estruturado = subparsers.add_parser("log_estruturado", help="Log completo (repr) x log estruturado.")
+    estruturado.add_argument("--tamanhos", type=int, nargs="+", default=[10, 1_000, 100_000])
+    estruturado.add_argument("--chamadas", type=int, default=200)
+
+    persistencia = subparsers.add_parser("persistencia", help="Vazão do diário e tempo de recuperação.")
+    persistencia.add_argument("--contas", type=int, default=100_000, help="use 1000000 para o cenário completo")
+    persistencia.add_argument("--transacoes", type=int, default=5_000_000, help="use 50000000 para o cenário completo")
+    persistencia.add_argument("--cauda", type=int, default=200_000, help="eventos no diário após o snapshot")
+    persistencia.add_argument("--gravar-a-cada", type=int, default=1)
+
+    lote = subparsers.add_parser("lote", help="Vazão do processamento em lote x um a um.")
+    lote.add_argument("--itens", type=int, default=200_000)
+    lote.add_argument("--contas", type=int, default=50_000)
+
+    importacao = subparsers.add_parser("importacao", help="Vazão da importação de CSV em blocos.")
+    importacao.add_argument("--linhas", type=int, default=500_000)
+    importacao.add_argument("--contas", type=int, default=50_000)
+    importacao.add_argument("--bloco", type=int, default=10_000)
+
+    concorrencia = subparsers.add_parser("concorrencia", help="Operações em várias threads + verificação de invariantes.")
+    concorrencia.add_argument("--threads", type=int, default=8)
+    concorrencia.add_argument("--contas", type=int, default=16, help="poucas contas aumentam a disputa")
+    concorrencia.add_argument("--operacoes", type=int, default=200_000)
+    concorrencia.add_argument("--sem-travas", action="store_true", help="desativa as travas (mostra as violações)")
+
+    fragmentado = subparsers.add_parser("fragmentado", help="Escalabilidade do motor fragmentado de 1 a N processos.")
+    fragmentado.add_argument("--fragmentos", type=int, default=os.cpu_count() or 1, help="N (padrão: número de CPUs)")
+    fragmentado.add_argument("--contas", type=int, default=50_000)
+    fragmentado.add_argument("--itens", type=int, default=1_000_000)
+    fragmentado.add_argument("--lote", type=int, default=50_000, help="itens enviados por chamada a processar()")
+
+    servidor = subparsers.add_parser("servidor", help="Latência p50/p99 do servidor asyncio com muitas conexões.")
+    servidor.add_argument("--conexoes", type=int, default=2_000)
+    servidor.add_argument("--requisicoes", type=int, default=50, help="requisições por conexão, uma de cada vez")
+    servidor.add_argument("--contas", type=int, default=1_000)
+    servidor.add_argument("--tcp", action="store_true", help="usa TCP em 127.0.0.1 em vez de socket Unix")
+
+    agregacao = subparsers.add_parser("agregacao", help="Somas sobre milhões de linhas: float x centavos.")
+    agregacao.add_argument("--linhas", type=int, default=5_000_000)
+
+    extrato = subparsers.add_parser("extrato", help="Tempo até a primeira página do extrato x extrato concatenado.")
+    extrato.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000, 100_000, 500_000])
+    extrato.add_argument("--cache-mib", type=int, default=256, help="limite do cache de linhas do extrato")
+
+    relatorio = subparsers.add_parser("relatorio_tipo", help="gerar_relatorio por tipo: varredura x índice por tipo.")
+    relatorio.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    relatorio.add_argument("--fracao-saques", type=float, default=0.05)
+
+    saldo_historico = subparsers.add_parser("saldo_historico", help="Saldo num instante passado: reprocessar x marcos.")
+    saldo_historico.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    saldo_historico.add_argument("--consultas", type=int, default=1_000)
+
+    listagem = subparsers.add_parser("listagem", help="Listagem de contas paginada x formatação de todas as contas.")
+    listagem.add_argument("--contas", type=int, default=1_000_000)
+    listagem.add_argument("--pagina", type=int, default=20)
+
+    numeracao = subparsers.add_parser("numeracao", help="Alocação de números de conta em threads e processos.")
+    numeracao.add_argument("--trabalhadores", type=int, default=4)
+    numeracao.add_argument("--numeros", type=int, default=200_000)
+    numeracao.add_argument("--blocos", type=int, nargs="+", default=[1, 100, 1_000], help="tamanhos de bloco a comparar")
+
+    indice = subparsers.add_parser("indice_contas", help="Busca de contas por (agência, número): varredura x índice.")
+    indice.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    indice.add_argument("--buscas", type=int, default=100_000)
+
+    args = parser.parse_args()
+    CENARIOS[args.cenario](args)
+
+
+if __name__ == "__main__":
+    main()
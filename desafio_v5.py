@@ -1,15 +1,335 @@
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import csv
+import inspect
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import pickle
+import queue
+import re
+import signal
+import sys
+import reprlib
+import struct
 import textwrap
+import threading
+import time
+import zlib
 from abc import ABC, abstractclassmethod, abstractproperty
-from datetime import datetime, date
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from itertools import compress, islice
+
+try:
+    import fcntl # Trava entre processos no arquivo do alocador (só em sistemas Unix)
+except ImportError:
+    fcntl = None
+from datetime import datetime, date, timedelta
 import functools # Necessário para @functools.wraps
 
 
+# ============ Datas Numéricas ============
+# As datas das transações são guardadas como microssegundos desde a época Unix (int);
+# a formatação em texto acontece apenas na hora de exibir o extrato.
+def para_microssegundos(momento):
+    return int(momento.timestamp()) * 1_000_000 + momento.microsecond
+
+
+def formatar_data(microssegundos, formato="%d-%m-%Y %H:%M:%S"):
+    return datetime.fromtimestamp(microssegundos / 1_000_000).strftime(formato)
+
+
+# ============ Valores em Centavos ============
+# Saldos, limites e valores das transações são inteiros em centavos em todo o
+# domínio, sem arredondamentos de ponto flutuante. A conversão de/para texto
+# acontece só nas bordas: entrada do usuário, CSV, JSON e telas.
+_FORMATO_VALOR = re.compile(r"(\d+)(?:\.(\d{1,2}))?")
+# Maior valor, em centavos, que cabe na coluna int64 de valores do Histórico
+VALOR_MAXIMO = 2**63 - 1
+
+
+def converter_valor(texto):
+    """
+    Converte um valor monetário em texto ("150", "150.50", "1.234,56", "R$ 10,00")
+    para centavos. Retorna None se o texto não for um valor positivo com até 2 casas
+    ou passar de VALOR_MAXIMO.
+    """
+    texto = texto.strip().removeprefix("R$").strip()
+    if "," in texto:
+        # Formato brasileiro: ponto como separador de milhar e vírgula decimal
+        texto = texto.replace(".", "").replace(",", ".")
+    formato = _FORMATO_VALOR.fullmatch(texto)
+    if not formato:
+        return None
+    reais, fracao = formato.groups()
+    centavos = int(reais) * 100 + int((fracao or "0").ljust(2, "0"))
+    return centavos if 0 < centavos <= VALOR_MAXIMO else None
+
+
+def formatar_moeda(centavos):
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(centavos), 100)
+    return f"R$ {sinal}{reais}.{resto:02d}"
+
+
+# ============ Escrita do Log em Segundo Plano ============
+# Garantias de entrega do log, escolhidas por implantação (variável BANCO_LOG_ENTREGA):
+# - "pelo_menos_uma_vez": com a fila cheia, quem registra espera; um lote que falhar
+#   na escrita é tentado de novo, com espera crescente, antes de se ler mais da fila
+#   (que então enche e segura quem registra). No encerramento, só uma última tentativa.
+# - "melhor_esforco": com a fila cheia ou em falha de escrita, a entrada é descartada
+#   (e contada), sem nunca atrasar a operação bancária.
+ENTREGA_PELO_MENOS_UMA_VEZ = "pelo_menos_uma_vez"
+ENTREGA_MELHOR_ESFORCO = "melhor_esforco"
+
+_FIM_DO_LOG = object() # Sentinela que pede à thread escritora para encerrar
+ESPERA_MAXIMA_LOG = 5.0 # Segundos, entre tentativas de gravar um lote que falhou
+
+
+class EscritorLogSincrono:
+    """
+    Escreve cada entrada diretamente no arquivo (abre, escreve e fecha a cada chamada).
+    """
+    def __init__(self, caminho="log.txt"):
+        self.caminho = caminho
+
+    def registrar(self, entrada):
+        with open(self.caminho, "a") as f: # 'a' para append (adicionar ao final)
+            f.write(str(entrada))
+
+    def encerrar(self):
+        pass
+
+
+class EscritorLogAssincrono:
+    """
+    Coloca as entradas de log numa fila limitada em memória, drenada por uma thread
+    em segundo plano que grava em lotes: quando o lote atinge `tamanho_lote` entradas
+    ou quando `intervalo` segundos se passam desde a primeira entrada do lote.
+    """
+    def __init__(self, caminho="log.txt", capacidade=10_000, tamanho_lote=512, intervalo=0.2,
+                 entrega=ENTREGA_PELO_MENOS_UMA_VEZ):
+        if entrega not in (ENTREGA_PELO_MENOS_UMA_VEZ, ENTREGA_MELHOR_ESFORCO):
+            raise ValueError(f"Modo de entrega de log inválido: {entrega!r}")
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.entrega = entrega
+        self.descartadas = 0
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._encerrado = False
+        self._acordar = threading.Event() # Interrompe a espera entre tentativas no encerramento
+        self._thread = threading.Thread(target=self._drenar, name="escritor-log", daemon=True)
+        self._thread.start()
+
+    def registrar(self, entrada):
+        if self._encerrado:
+            # Após o encerramento não há thread escritora: grava diretamente
+            with open(self.caminho, "a") as f:
+                f.write(str(entrada))
+            return
+        if self.entrega == ENTREGA_PELO_MENOS_UMA_VEZ:
+            self._fila.put(entrada)
+            return
+        try:
+            self._fila.put_nowait(entrada)
+        except queue.Full:
+            self.descartadas += 1
+
+    def encerrar(self):
+        """
+        Grava todas as entradas pendentes e finaliza a thread escritora.
+        """
+        if self._encerrado:
+            return
+        self._encerrado = True
+        self._acordar.set()
+        self._fila.put(_FIM_DO_LOG)
+        self._thread.join()
+
+    def _coletar_lote(self):
+        # Bloqueia até a primeira entrada e depois junta outras até encher o lote
+        # ou até esgotar o intervalo. Retorna (lote, encerrar).
+        entrada = self._fila.get()
+        if entrada is _FIM_DO_LOG:
+            return [], True
+        lote = [entrada]
+        prazo = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = prazo - time.monotonic()
+            try:
+                entrada = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if entrada is _FIM_DO_LOG:
+                return lote, True
+            lote.append(entrada)
+        return lote, False
+
+    def _gravar(self, lote):
+        try:
+            with open(self.caminho, "a") as f:
+                # Entradas estruturadas só são formatadas aqui, na thread escritora
+                f.write("".join(map(str, lote)))
+            return True
+        except OSError:
+            return False
+
+    def _gravar_com_tentativas(self, lote):
+        # Pelo menos uma vez: repete a gravação do lote, com espera crescente, até
+        # conseguir. Enquanto isso nada sai da fila, que enche e faz registrar()
+        # bloquear (contrapressão): a memória fica limitada à fila mais um lote.
+        # No encerramento cada lote tem uma única tentativa.
+        espera = self.intervalo
+        while not self._gravar(lote):
+            if self.entrega == ENTREGA_MELHOR_ESFORCO or self._encerrado:
+                self.descartadas += len(lote)
+                return
+            self._acordar.wait(espera)
+            espera = min(espera * 2, ESPERA_MAXIMA_LOG)
+
+    def _drenar(self):
+        encerrar = False
+        while not encerrar:
+            lote, encerrar = self._coletar_lote()
+            if lote:
+                self._gravar_com_tentativas(lote)
+
+
+_escritor_log = None
+
+
+def configurar_log(escritor):
+    """
+    Substitui o destino do log usado por @log_transacao, encerrando o anterior.
+    """
+    global _escritor_log
+    if _escritor_log is not None:
+        _escritor_log.encerrar()
+    _escritor_log = escritor
+
+
+def obter_escritor_log():
+    global _escritor_log
+    if _escritor_log is None:
+        _escritor_log = EscritorLogAssincrono(
+            entrega=os.environ.get("BANCO_LOG_ENTREGA", ENTREGA_PELO_MENOS_UMA_VEZ)
+        )
+    return _escritor_log
+
+
+def encerrar_log():
+    if _escritor_log is not None:
+        _escritor_log.encerrar()
+
+
+atexit.register(encerrar_log)
+
+
+# ============ Log Estruturado ============
+# No modo estruturado, cada operação declara os campos que quer registrar (CPF, conta,
+# valor, resultado...). Só esses campos são guardados, com repr de tamanho limitado,
+# e a formatação do texto fica para a thread escritora: o custo por chamada é O(1),
+# independente de quantos clientes existem.
+_campos_log_atual = contextvars.ContextVar("campos_log_atual", default=None)
+
+_repr_log = reprlib.Repr()
+_repr_log.maxstring = 80
+_repr_log.maxother = 80
+_repr_log.maxlist = _repr_log.maxtuple = _repr_log.maxdict = _repr_log.maxset = 4
+_repr_log.maxlevel = 2
+
+
+def anotar_log(**campos):
+    """
+    Anota campos na entrada de log estruturado da operação decorada em andamento.
+    Campos não declarados pela operação são ignorados; fora de uma operação
+    decorada, a chamada não faz nada.
+    """
+    campos_atuais = _campos_log_atual.get()
+    if campos_atuais is None:
+        return
+    for nome, valor in campos.items():
+        if nome in campos_atuais:
+            campos_atuais[nome] = valor
+
+
+class EntradaLogEstruturada:
+    """
+    Entrada de log cujos campos só viram texto quando o escritor chama str().
+    """
+    __slots__ = ("instante", "nome_funcao", "campos")
+
+    def __init__(self, instante, nome_funcao, campos):
+        self.instante = instante
+        self.nome_funcao = nome_funcao
+        self.campos = campos
+
+    def __str__(self):
+        data_hora = datetime.fromtimestamp(self.instante).strftime("%Y-%m-%d %H:%M:%S")
+        campos_str = ", ".join(
+            f"{nome}={_repr_log.repr(valor)}" for nome, valor in self.campos.items() if valor is not None
+        )
+        return (
+            f"[{data_hora}] Função: {self.nome_funcao}\n"
+            f"  Campos: {campos_str}\n"
+            f"----------------------------------------\n"
+        )
+
+
+def _log_estruturado(func, campos):
+    # Posição de cada campo declarado que também é parâmetro da função,
+    # calculada uma única vez na decoração
+    parametros = list(inspect.signature(func).parameters)
+    campos_de_parametros = {nome: parametros.index(nome) for nome in campos if nome in parametros}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        campos_chamada = dict.fromkeys(campos)
+        for nome, posicao in campos_de_parametros.items():
+            if posicao < len(args):
+                campos_chamada[nome] = args[posicao]
+            elif nome in kwargs:
+                campos_chamada[nome] = kwargs[nome]
+
+        token = _campos_log_atual.set(campos_chamada)
+        try:
+            resultado = func(*args, **kwargs)
+        except Exception as e:
+            resultado = None
+            if "resultado" in campos_chamada:
+                campos_chamada["resultado"] = f"exceção: {type(e).__name__}"
+        finally:
+            _campos_log_atual.reset(token)
+
+        obter_escritor_log().registrar(EntradaLogEstruturada(time.time(), func.__name__, campos_chamada))
+        return resultado
+    return wrapper
+
+
 # ============ Decorador de Log em Arquivo ============
-def log_transacao(func):
+def log_transacao(func=None, *, campos=None):
     """
     Decorador para registrar informações detalhadas de cada chamada de função
-    em um arquivo de log chamado 'log.txt'.
+    em um arquivo de log chamado 'log.txt'. A gravação é feita pelo escritor
+    configurado (por padrão, em segundo plano; veja EscritorLogAssincrono).
+
+    Usado como @log_transacao, registra o repr de todos os argumentos. Usado como
+    @log_transacao(campos=("cpf", "valor", ...)), registra só os campos declarados,
+    preenchidos pelos parâmetros de mesmo nome ou por anotar_log() (modo estruturado).
     """
+    if func is None:
+        return lambda f: log_transacao(f, campos=campos)
+    if campos is not None:
+        return _log_estruturado(func, tuple(campos))
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         # 1. Data e hora atuais
@@ -50,38 +370,323 @@ def log_transacao(func):
             f"----------------------------------------\n" # Separador para cada entrada
         )
         
-        with open("log.txt", "a") as f: # 'a' para append (adicionar ao final)
-            f.write(log_entry)
-            
+        obter_escritor_log().registrar(log_entry)
+
         return resultado
     return wrapper
 
 
 # ============ Iterador Personalizado (ContasIterador) ============
+def formatar_conta(conta):
+    return (
+        f"Agência:\t{conta.agencia}\n"
+        f"Número:\t\t{conta.numero}\n"
+        f"Titular:\t{conta.cliente.nome}\n"
+        f"Saldo:\t\t{formatar_moeda(conta.saldo)}\n"
+    )
+
+
 class ContasIterador:
-    def __init__(self, contas):
+    """
+    Visão leve sobre a lista de contas, sem cópia: iterar gera o texto de cada
+    conta só quando ele é pedido, e uma fatia (iterador[100:200]) devolve outra
+    visão sobre as mesmas contas.
+    """
+    __slots__ = ("contas", "_posicoes")
+
+    def __init__(self, contas, _posicoes=None):
         self.contas = contas
-        self._index = 0
+        self._posicoes = range(len(contas)) if _posicoes is None else _posicoes
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return ContasIterador(self.contas, self._posicoes[indice])
+        return formatar_conta(self.contas[self._posicoes[indice]])
 
     def __iter__(self):
-        self._index = 0
-        return self
+        contas = self.contas
+        for posicao in self._posicoes:
+            yield formatar_conta(contas[posicao])
 
-    def __next__(self):
-        try:
-            conta = self.contas[self._index]
-            self._index += 1
-            return f"""\
-            Agência:\t{conta.agencia}
-            Número:\t\t{conta.numero}
-            Titular:\t{conta.cliente.nome}
-            Saldo:\t\tR$ {conta.saldo:.2f}
+
+# ============ Listagem Paginada de Contas ============
+TAMANHO_PAGINA_CONTAS = 20
+SEPARADOR_CONTAS = "-" * 50 + "\n"
+
+
+def filtrar_contas(contas, cursor=0, agencia=None, saldo_minimo=None):
+    """
+    Gera (posição, conta) para as contas a partir da posição `cursor` que passam
+    nos filtros: agência exata e saldo mínimo (em centavos).
+    """
+    if cursor < 0:
+        # contas[-1] existe: um cursor negativo repetiria contas já listadas
+        raise ValueError(f"cursor inválido: {cursor}")
+    for posicao in range(cursor, len(contas)):
+        conta = contas[posicao]
+        if agencia is not None and conta.agencia != agencia:
+            continue
+        if saldo_minimo is not None and conta.saldo < saldo_minimo:
+            continue
+        yield posicao, conta
+
+
+def _pagina_contas(visao, proximo_cursor):
+    # Formata as contas de uma visão (ContasIterador), cada uma seguida do separador
+    linhas = []
+    for texto in visao:
+        linhas += (texto, SEPARADOR_CONTAS)
+    return Pagina(linhas, proximo_cursor)
+
+
+def paginas_contas(contas, tamanho_pagina=TAMANHO_PAGINA_CONTAS, cursor=0, agencia=None, saldo_minimo=None):
+    """
+    Gera a listagem de contas em páginas de até `tamanho_pagina` contas, formatando
+    só a página da vez. O cursor de cada página é a posição, na lista de contas, da
+    primeira conta da página seguinte; passe-o em `cursor` para continuar depois.
+
+    Cada página é uma visão ContasIterador: sem filtros, uma fatia da visão de todas
+    as contas; com filtros, uma visão sobre as posições das contas selecionadas.
+    """
+    if tamanho_pagina <= 0:
+        raise ValueError(f"tamanho de página inválido: {tamanho_pagina}")
+    if agencia is None and saldo_minimo is None:
+        if cursor < 0:
+            raise ValueError(f"cursor inválido: {cursor}")
+        visao = ContasIterador(contas)
+        for inicio in range(cursor, len(visao), tamanho_pagina):
+            fim = inicio + tamanho_pagina
+            yield _pagina_contas(visao[inicio:fim], fim if fim < len(visao) else None)
+        return
+
+    posicoes = []
+    for posicao, _ in filtrar_contas(contas, cursor, agencia, saldo_minimo):
+        if len(posicoes) == tamanho_pagina:
+            # Só entrega a página cheia ao achar a próxima conta, para saber se há mais
+            yield _pagina_contas(ContasIterador(contas, posicoes), posicao)
+            posicoes = []
+        posicoes.append(posicao)
+    if posicoes:
+        yield _pagina_contas(ContasIterador(contas, posicoes), None)
+
+
+# ============ Registro de Clientes Indexado por CPF ============
+class ClienteRegistry:
+    """
+    Cadastro de clientes com índice CPF -> cliente (busca e inserção em O(1))
+    e lista na ordem de inserção, para iterar os clientes como antes.
+    """
+    __slots__ = ("_por_cpf", "_clientes")
+
+    def __init__(self, clientes=None):
+        self._por_cpf = {}
+        self._clientes = []
+        for cliente in clientes or ():
+            self.adicionar(cliente)
+
+    def adicionar(self, cliente):
+        # Garante a unicidade do CPF: retorna False se ele já estiver cadastrado.
+        # setdefault verifica e insere numa única operação, seguro entre threads.
+        if self._por_cpf.setdefault(cliente.cpf, cliente) is not cliente:
+            return False
+        self._clientes.append(cliente)
+        if _diario_ativo is not None:
+            _diario_ativo.registrar_cliente(cliente)
+        return True
+
+    def buscar(self, cpf):
+        return self._por_cpf.get(cpf)
+
+    def __contains__(self, cpf):
+        return cpf in self._por_cpf
+
+    def __len__(self):
+        return len(self._clientes)
+
+    def __iter__(self):
+        return iter(self._clientes)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} clientes>"
+
+
+# ============ Índice de Contas ============
+class IndiceContas:
+    """
+    Lista global de contas com índice (agência, número) -> conta, para achar uma
+    conta em O(1) sem passar pelo cliente. Continua se comportando como a lista de
+    antes: append, len, iteração e acesso por posição na ordem de criação.
+
+    O índice também aceita só o número da conta (int); por isso serve direto como
+    `contas_por_chave` de processar_lote. Números vêm do alocador e não se repetem
+    nem entre agências: uma conta com número já usado é recusada.
+    """
+    __slots__ = ("_por_chave", "_contas")
+
+    def __init__(self, contas=None):
+        self._por_chave = {}
+        self._contas = []
+        for conta in contas or ():
+            self.append(conta)
+
+    def adicionar(self, conta):
+        # Retorna False, sem incluir a conta, se o número já estiver no índice (em
+        # qualquer agência). Número único implica (agência, número) único, então
+        # basta o setdefault no número para verificar e reservar de uma vez.
+        if self._por_chave.setdefault(conta.numero, conta) is not conta:
+            return False
+        self._por_chave[(conta.agencia, conta.numero)] = conta
+        self._contas.append(conta)
+        return True
+
+    def append(self, conta):
+        if not self.adicionar(conta):
+            raise ValueError(f"número de conta {conta.numero} já cadastrado")
+
+    def buscar(self, agencia, numero):
+        return self._por_chave.get((agencia, numero))
+
+    def get(self, chave, padrao=None):
+        # chave: (agência, número) ou só o número
+        return self._por_chave.get(chave, padrao)
+
+    def buscar_varios(self, chaves):
+        """
+        Multi-get para lotes: retorna as contas das chaves ((agência, número) ou
+        número) na mesma ordem, com None nas que não existirem.
         """
-        except IndexError:
-            raise StopIteration
+        return list(map(self._por_chave.get, chaves))
+
+    def __contains__(self, chave):
+        return chave in self._por_chave
+
+    def __len__(self):
+        return len(self._contas)
+
+    def __iter__(self):
+        return iter(self._contas)
+
+    def __getitem__(self, posicao):
+        # Por posição (ou fatia), como na lista; para buscar por chave use get/buscar
+        return self._contas[posicao]
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} contas>"
+
+
+# ============ Motivos de Recusa ============
+MOTIVO_SALDO_INSUFICIENTE = "saldo_insuficiente"
+MOTIVO_VALOR_INVALIDO = "valor_invalido"
+MOTIVO_NAO_MULTIPLO_DE_5 = "valor_nao_multiplo_de_5"
+MOTIVO_LIMITE_TRANSACOES = "limite_de_transacoes_excedido"
+MOTIVO_LIMITE_VALOR = "limite_de_valor_excedido"
+MOTIVO_LIMITE_SAQUES = "limite_de_saques_excedido"
+MOTIVO_CLIENTE_NAO_ENCONTRADO = "cliente_nao_encontrado"
+MOTIVO_CONTA_NAO_ENCONTRADA = "conta_nao_encontrada"
+MOTIVO_CONTA_AMBIGUA = "conta_ambigua"
+MOTIVO_TIPO_INVALIDO = "tipo_invalido"
+MOTIVO_LINHA_INVALIDA = "linha_invalida"
+MOTIVO_CPF_DUPLICADO = "cpf_duplicado"
+MOTIVO_CONTA_DUPLICADA = "conta_duplicada"
+MOTIVO_OPERACAO_INVALIDA = "operacao_invalida"
+MOTIVO_SEM_CONTA = "sem_conta"
+MOTIVO_OPERACAO_CANCELADA = "operacao_cancelada"
+MOTIVO_PERIODO_INVALIDO = "periodo_invalido"
+
+# Mensagens exibidas ao usuário; os campos entre chaves são preenchidos com a conta
+# (e {limite} com o limite de valor da conta já formatado)
+MENSAGENS_RECUSA = {
+    MOTIVO_SALDO_INSUFICIENTE: "Operação falhou! Você não tem saldo suficiente.",
+    MOTIVO_VALOR_INVALIDO: "Operação falhou! O valor informado é inválido.",
+    MOTIVO_NAO_MULTIPLO_DE_5: "Operação falhou! O valor do saque deve ser múltiplo de R$ 5,00.",
+    MOTIVO_LIMITE_TRANSACOES: "Você excedeu o número de {conta.limite_transacoes_diarias} transações permitidas para hoje nesta conta!",
+    MOTIVO_LIMITE_VALOR: "Operação falhou! O valor do saque excede o limite de {limite}.",
+    MOTIVO_LIMITE_SAQUES: "Operação falhou! Número máximo de saques diários ({conta.limite_saques}) excedido.",
+    MOTIVO_CLIENTE_NAO_ENCONTRADO: "Cliente não encontrado!",
+    MOTIVO_CONTA_NAO_ENCONTRADA: "Conta não encontrada!",
+    MOTIVO_CONTA_AMBIGUA: "Cliente possui mais de uma conta; informe o número da conta.",
+    MOTIVO_TIPO_INVALIDO: "Tipo de transação inválido!",
+    MOTIVO_LINHA_INVALIDA: "Linha mal formada.",
+    MOTIVO_CPF_DUPLICADO: "Já existe cliente com esse CPF!",
+    MOTIVO_CONTA_DUPLICADA: "Já existe conta com esse número!",
+    MOTIVO_OPERACAO_INVALIDA: "Operação inválida.",
+    MOTIVO_SEM_CONTA: "Cliente não possui conta!",
+    MOTIVO_OPERACAO_CANCELADA: "Operação cancelada.",
+    MOTIVO_PERIODO_INVALIDO: "Período inválido. Use datas no formato dd-mm-aaaa.",
+}
+
+
+def mensagem_recusa(motivo, conta=None):
+    limite = formatar_moeda(conta.limite) if motivo == MOTIVO_LIMITE_VALOR else None
+    return MENSAGENS_RECUSA[motivo].format(conta=conta, limite=limite)
+
+
+# ============ Resultados das Operações ============
+# As operações do domínio não escrevem no terminal: devolvem um Resultado, e a
+# interface (exibir_resultado) é apenas uma das formas de apresentá-lo.
+RESULTADO_SUCESSO = "sucesso"
+OPERACAO_SAQUE = "saque"
+OPERACAO_DEPOSITO = "deposito"
+OPERACAO_NOVO_CLIENTE = "novo_cliente"
+OPERACAO_NOVA_CONTA = "nova_conta"
+
+MENSAGENS_SUCESSO = {
+    OPERACAO_SAQUE: "Saque realizado com sucesso!",
+    OPERACAO_DEPOSITO: "Depósito realizado com sucesso!",
+    OPERACAO_NOVO_CLIENTE: "Cliente criado com sucesso!",
+    OPERACAO_NOVA_CONTA: "Conta criada com sucesso!",
+}
+
+
+class Resultado:
+    """
+    Resultado de uma operação: sucesso ou recusa com um dos motivos MOTIVO_*.
+    É verdadeiro em contexto booleano quando a operação teve sucesso.
+    """
+    __slots__ = ("operacao", "motivo", "conta")
 
+    def __init__(self, operacao, motivo=None, conta=None):
+        self.operacao = operacao
+        self.motivo = motivo
+        self.conta = conta
 
+    @property
+    def sucesso(self):
+        return self.motivo is None
+
+    @property
+    def codigo(self):
+        # Mesmo vocabulário usado por processar_lote: RESULTADO_SUCESSO ou o motivo
+        return RESULTADO_SUCESSO if self.motivo is None else self.motivo
+
+    def __bool__(self):
+        return self.motivo is None
+
+    @property
+    def mensagem(self):
+        if self.motivo is None:
+            return MENSAGENS_SUCESSO[self.operacao]
+        return mensagem_recusa(self.motivo, self.conta)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: ('{self.operacao}', '{self.codigo}')>"
+
+
+def exibir_resultado(resultado):
+    if resultado:
+        print(f"\n=== {resultado.mensagem} ===")
+    else:
+        print(f"\n@@@ {resultado.mensagem} @@@")
+
+
+# As classes do domínio usam __slots__: sem o __dict__ por instância, cada objeto
+# ocupa apenas o espaço dos seus atributos, o que pesa com milhões de contas.
 class Cliente:
+    __slots__ = ("endereco", "contas")
+
     def __init__(self, endereco):
         self.endereco = endereco
         self.contas = []
@@ -92,19 +697,20 @@ class Cliente:
         # Se o limite de transações diárias for para o cliente (todas as contas dele),
         # esta lógica ficaria aqui. Por agora, mantém-se por conta.
         
-        # O método registrar agora retorna True/False, então podemos verificar o sucesso.
-        sucesso_registro = transacao.registrar(conta)
-        if not sucesso_registro:
-            # A mensagem de erro já é impressa dentro de sacar/depositar/validacao de limite
-            return False
-        return True
+        # O método registrar retorna um Resultado (verdadeiro em caso de sucesso),
+        # que a interface decide se e como exibir.
+        return transacao.registrar(conta)
 
 
     def adicionar_conta(self, conta):
         self.contas.append(conta)
+        if _diario_ativo is not None:
+            _diario_ativo.registrar_conta(conta)
 
 
 class PessoaFisica(Cliente):
+    __slots__ = ("nome", "data_nascimento", "cpf")
+
     def __init__(self, nome, data_nascimento, cpf, endereco):
         super().__init__(endereco)
         self.nome = nome
@@ -115,13 +721,40 @@ class PessoaFisica(Cliente):
         return f"<{self.__class__.__name__}: ('{self.cpf}')>"
 
 
+AGENCIA_PADRAO = "0001"
+
+
+# ============ Concorrência ============
+# Com a concorrência ativada, cada conta ganha uma trava própria (criada no primeiro
+# uso) que cobre, como um único passo atômico, as validações de limite, a alteração
+# do saldo e o registro no Histórico. Desativada, a trava é um contexto vazio e as
+# contas não gastam memória com ela. Ative antes de iniciar as threads.
+_concorrencia_ativa = False
+_TRAVA_NULA = contextlib.nullcontext()
+_trava_criacao = threading.Lock()
+# Índices do Histórico montados sob demanda (por tipo e marcos de saldo) são
+# alterados em consultas, fora da trava da conta: a atualização passa por esta
+# trava. Cada linha é indexada uma única vez, então ela fica pouco tempo ocupada.
+_trava_indices = threading.Lock()
+
+
+def configurar_concorrencia(ativa=True):
+    global _concorrencia_ativa
+    _concorrencia_ativa = ativa
+
+
 class Conta:
+    __slots__ = ("_saldo", "_numero", "_agencia", "_cliente", "_historico", "_trava")
+
     def __init__(self, numero, cliente):
         self._saldo = 0
         self._numero = numero
-        self._agencia = "0001"
+        self._agencia = AGENCIA_PADRAO
         self._cliente = cliente
-        self._historico = Historico()
+        # O Histórico só é criado na primeira vez em que for acessado,
+        # então contas sem movimentação não pagam por ele
+        self._historico = None
+        self._trava = None
 
     @classmethod
     def nova_conta(cls, cliente, numero):
@@ -145,34 +778,64 @@ class Conta:
 
     @property
     def historico(self):
-        return self._historico
+        historico = self._historico
+        if historico is None:
+            # Criado sob a trava da conta (verificando de novo lá dentro): um leitor não
+            # pode trocar o Histórico em que um depósito em andamento acabou de gravar
+            with self.trava:
+                if self._historico is None:
+                    self._historico = _fabrica_historico(self)
+                historico = self._historico
+        return historico
 
-    def sacar(self, valor):
-        saldo = self.saldo
-        excedeu_saldo = valor > saldo
+    @property
+    def trava(self):
+        if not _concorrencia_ativa:
+            return _TRAVA_NULA
+        trava = self._trava
+        if trava is None:
+            with _trava_criacao:
+                if self._trava is None:
+                    self._trava = threading.RLock()
+                trava = self._trava
+        return trava
+
+    def validar_saque(self, valor, transacoes_hoje=None, saques_hoje=None):
+        """
+        Retorna o motivo pelo qual o saque seria recusado, ou None se ele pode ser feito.
+        As contagens do dia podem ser informadas já calculadas (processamento em lote).
+        """
+        if valor > self.saldo:
+            return MOTIVO_SALDO_INSUFICIENTE
+        if not 0 < valor <= VALOR_MAXIMO:
+            return MOTIVO_VALOR_INVALIDO
+        return None
 
-        if excedeu_saldo:
-            print("\n@@@ Operação falhou! Você não tem saldo suficiente. @@@")
-        elif valor <= 0:
-            print("\n@@@ Operação falhou! O valor informado é inválido. @@@")
-        else:
-            self._saldo -= valor
-            print("\n=== Saque realizado com sucesso! ===")
-            return True
-        return False
+    def validar_deposito(self, valor):
+        # O saldo também precisa caber em int64 (marcos de saldo do Histórico)
+        if not 0 < valor <= VALOR_MAXIMO or self.saldo + valor > VALOR_MAXIMO:
+            return MOTIVO_VALOR_INVALIDO
+        return None
+
+    def sacar(self, valor):
+        motivo = self.validar_saque(valor)
+        if motivo:
+            return Resultado(OPERACAO_SAQUE, motivo, self)
+        Saque._efetivar(self, valor)
+        return Resultado(OPERACAO_SAQUE, conta=self)
 
     def depositar(self, valor):
-        if valor > 0:
-            self._saldo += valor
-            print("\n=== Depósito realizado com sucesso! ===")
-        else:
-            print("\n@@@ Operação falhou! O valor informado é inválido. @@@")
-            return False
-        return True
+        motivo = self.validar_deposito(valor)
+        if motivo:
+            return Resultado(OPERACAO_DEPOSITO, motivo, self)
+        Deposito._efetivar(self, valor)
+        return Resultado(OPERACAO_DEPOSITO, conta=self)
 
 
 class ContaCorrente(Conta):
-    def __init__(self, numero, cliente, limite=500, limite_saques=3):
+    __slots__ = ("_limite", "_limite_saques", "limite_transacoes_diarias")
+
+    def __init__(self, numero, cliente, limite=50_000, limite_saques=3):
         super().__init__(numero, cliente)
         self._limite = limite
         self._limite_saques = limite_saques
@@ -181,7 +844,7 @@ class ContaCorrente(Conta):
 
     @property
     def limite(self):
-        return self._limite
+        return self._limite # Em centavos
 
     @property
     def limite_saques(self):
@@ -191,35 +854,26 @@ class ContaCorrente(Conta):
     def nova_conta(cls, cliente, numero, limite, limite_saques):
         return cls(numero, cliente, limite, limite_saques)
 
-    def sacar(self, valor):
-        # Validação de saque múltiplo de R$ 5,00 (cédulas)
-        if valor % 5 != 0:
-            print("\n@@@ Operação falhou! O valor do saque deve ser múltiplo de R$ 5,00. @@@")
-            return False
+    def validar_saque(self, valor, transacoes_hoje=None, saques_hoje=None):
+        # Validação de saque múltiplo de R$ 5,00 (cédulas), com o valor em centavos
+        if valor % 500 != 0:
+            return MOTIVO_NAO_MULTIPLO_DE_5
 
-        # Validação de Limite de Transações Diárias por CONTA (MOVIDA PARA CÁ)
-        transacoes_hoje = list(self.historico.transacoes_do_dia())
-        if len(transacoes_hoje) >= self.limite_transacoes_diarias:
-            print(f"\n@@@ Você excedeu o número de {self.limite_transacoes_diarias} transações permitidas para hoje nesta conta! @@@")
-            return False
+        # Validação de Limite de Transações Diárias por CONTA
+        # Os contadores diários do Histórico tornam estas verificações O(1)
+        if transacoes_hoje is None:
+            transacoes_hoje = self.historico.quantidade_transacoes_do_dia()
+        if transacoes_hoje >= self.limite_transacoes_diarias:
+            return MOTIVO_LIMITE_TRANSACOES
 
+        if saques_hoje is None:
+            saques_hoje = self.historico.quantidade_transacoes_do_dia(Saque.__name__)
 
-        numero_saques_diarios = len(
-            [transacao for transacao in transacoes_hoje if transacao["tipo"] == Saque.__name__]
-        )
-        
-        excedeu_limite_valor = valor > self.limite
-        excedeu_saques = numero_saques_diarios >= self.limite_saques
-
-        if excedeu_limite_valor:
-            print(f"\n@@@ Operação falhou! O valor do saque excede o limite de R$ {self.limite:.2f}. @@@")
-        elif excedeu_saques:
-            print(f"\n@@@ Operação falhou! Número máximo de saques diários ({self.limite_saques}) excedido. @@@")
-        else:
-            # Chama o sacar da classe pai (Conta). Se super().sacar(valor) for True, então o saque foi bem-sucedido.
-            return super().sacar(valor)
-
-        return False
+        if valor > self.limite:
+            return MOTIVO_LIMITE_VALOR
+        if saques_hoje >= self.limite_saques:
+            return MOTIVO_LIMITE_SAQUES
+        return super().validar_saque(valor)
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: ('{self.agencia}', '{self.numero}', '{self.cliente.nome}')>"
@@ -233,57 +887,676 @@ class ContaCorrente(Conta):
         """
 
 
+# ============ Histórico Colunar ============
+# Cada tipo de transação recebe um código numérico pequeno, guardado em 1 byte por linha
+NOMES_TIPO_TRANSACAO = []
+_CODIGOS_TIPO_TRANSACAO = {}
+# Nome normalizado (minúsculas) -> código, preenchido uma vez no registro do tipo
+_CODIGOS_TIPO_NORMALIZADOS = {}
+
+
+_SINAIS_TIPO = [] # Código do tipo -> efeito sobre o saldo (+1/-1), na ordem dos códigos
+
+
+def _sinais_por_codigo():
+    if len(_SINAIS_TIPO) < len(NOMES_TIPO_TRANSACAO):
+        _SINAIS_TIPO[:] = [classe_transacao(nome).sinal for nome in NOMES_TIPO_TRANSACAO]
+    return _SINAIS_TIPO
+
+
+def codigo_tipo_transacao(nome_tipo):
+    codigo = _CODIGOS_TIPO_TRANSACAO.get(nome_tipo)
+    if codigo is None:
+        with _trava_criacao:
+            codigo = _CODIGOS_TIPO_TRANSACAO.get(nome_tipo)
+            if codigo is None:
+                codigo = len(NOMES_TIPO_TRANSACAO)
+                NOMES_TIPO_TRANSACAO.append(nome_tipo)
+                _CODIGOS_TIPO_NORMALIZADOS[nome_tipo.lower()] = codigo
+                _CODIGOS_TIPO_TRANSACAO[nome_tipo] = codigo
+    return codigo
+
+
+class RegistroTransacao(Mapping):
+    """
+    Visão leve (somente leitura) de uma linha do Histórico colunar. Comporta-se
+    como o antigo dicionário {"tipo", "valor", "data"}, mas não copia os dados;
+    o valor é dado em centavos.
+    """
+    __slots__ = ("_historico", "_indice")
+    _CHAVES = ("tipo", "valor", "data")
+
+    def __init__(self, historico, indice):
+        self._historico = historico
+        self._indice = indice
+
+    def __getitem__(self, chave):
+        historico, indice = self._historico, self._indice
+        if chave == "tipo":
+            return NOMES_TIPO_TRANSACAO[historico._tipos[indice]]
+        if chave == "valor":
+            return historico._valores[indice]
+        if chave == "data":
+            return historico._datas[indice]
+        raise KeyError(chave)
+
+    def __iter__(self):
+        return iter(self._CHAVES)
+
+    def __len__(self):
+        return len(self._CHAVES)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TransacoesView(Sequence):
+    """
+    Sequência somente leitura sobre as linhas de um Histórico, que cria
+    as visões RegistroTransacao sob demanda.
+    """
+    __slots__ = ("_historico",)
+
+    def __init__(self, historico):
+        self._historico = historico
+
+    def __len__(self):
+        return len(self._historico)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [RegistroTransacao(self._historico, i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice de transação fora do intervalo")
+        return RegistroTransacao(self._historico, indice)
+
+
 class Historico:
+    """
+    Histórico de transações em colunas paralelas (arrays tipados):
+    código do tipo (1 byte), valor em centavos (8 bytes) e data em
+    microssegundos (8 bytes), em vez de um dicionário por transação.
+    """
+    __slots__ = (
+        "_tipos", "_valores", "_datas", "_ultima_data", "_dia_contagem", "_contagem_do_dia",
+        "_posicoes_por_tipo", "_posicoes_indexadas", "_saldos_marco",
+    )
+    # Um marco de saldo acumulado a cada tantas transações (veja saldo_em)
+    TRANSACOES_POR_MARCO = 256
+
     def __init__(self):
-        self._transacoes = []
+        self._tipos = array("B")
+        self._valores = array("q")
+        self._datas = array("q")
+        self._ultima_data = 0
+        # Contadores do dia corrente por tipo de transação, reiniciados na virada do dia
+        self._dia_contagem = None
+        self._contagem_do_dia = None
+        # Índice secundário: código do tipo -> posições das transações daquele tipo
+        self._posicoes_por_tipo = None
+        self._posicoes_indexadas = 0
+        # Saldo acumulado, em centavos, ao fim de cada bloco de TRANSACOES_POR_MARCO transações
+        self._saldos_marco = None
+
+    def __len__(self):
+        return len(self._datas)
 
     @property
     def transacoes(self):
-        return self._transacoes
+        return TransacoesView(self)
 
     def adicionar_transacao(self, transacao):
-        self._transacoes.append(
-            {
-                "tipo": transacao.__class__.__name__,
-                "valor": transacao.valor,
-                "data": datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
-            }
-        )
+        agora = datetime.now()
+        self._adicionar(transacao.__class__.__name__, transacao.valor, para_microssegundos(agora), agora.date())
+
+    def _adicionar(self, tipo, valor, data, hoje):
+        # Datas monotônicas: se o relógio voltar, repete-se a última data registrada,
+        # mantendo a coluna ordenada para buscas binárias
+        data = max(data, self._ultima_data)
+        self._anexar(codigo_tipo_transacao(tipo), valor, data)
+
+        if hoje != self._dia_contagem:
+            self._dia_contagem = hoje
+            self._contagem_do_dia = {}
+        self._contagem_do_dia[tipo] = self._contagem_do_dia.get(tipo, 0) + 1
+
+    def _anexar(self, codigo_tipo, centavos, data):
+        # Valor primeiro: é a coluna que pode recusar o número (int64), antes de as
+        # outras colunas terem sido alteradas
+        self._valores.append(centavos)
+        self._datas.append(data)
+        self._tipos.append(codigo_tipo)
+        self._ultima_data = data
+
+    def _restaurar(self, tipos, valores, datas):
+        # Substitui as colunas de uma vez (usado na recuperação a partir de um snapshot);
+        # os contadores diários devem ser refeitos depois com _recalcular_contagem_do_dia
+        self._tipos, self._valores, self._datas = tipos, valores, datas
+        self._ultima_data = datas[-1] if datas else 0
+        self._posicoes_por_tipo = None
+        self._posicoes_indexadas = 0
+        self._saldos_marco = None
+
+    def _recalcular_contagem_do_dia(self, hoje, inicio_do_dia):
+        # Refaz os contadores diários a partir das transações de hoje (final das colunas)
+        self._dia_contagem = hoje
+        self._contagem_do_dia = {}
+        if not self._datas or self._datas[-1] < inicio_do_dia:
+            return
+        for indice in range(bisect_left(self._datas, inicio_do_dia), len(self)):
+            tipo = NOMES_TIPO_TRANSACAO[self._tipos[indice]]
+            self._contagem_do_dia[tipo] = self._contagem_do_dia.get(tipo, 0) + 1
+
+    def quantidade_transacoes_do_dia(self, tipo_transacao=None, hoje=None):
+        """
+        Retorna, em tempo constante, quantas transações (de um tipo, se informado)
+        foram realizadas no dia atual.
+        """
+        if self._dia_contagem != (hoje or date.today()):
+            return 0
+        if tipo_transacao is None:
+            return sum(self._contagem_do_dia.values())
+        return self._contagem_do_dia.get(tipo_transacao, 0)
+
+    def total(self, tipo_transacao=None):
+        """
+        Soma dos valores, em centavos, de todas as transações ou só das do tipo
+        informado. A soma percorre a coluna de inteiros em C, sem objetos por linha.
+        """
+        if tipo_transacao is None:
+            return sum(self._valores)
+        codigo = _CODIGOS_TIPO_TRANSACAO.get(tipo_transacao)
+        if codigo is None:
+            return 0
+        # Máscara com 1 byte por linha (1 nas linhas do tipo pedido) para o compress
+        tabela = bytearray(256)
+        tabela[codigo] = 1
+        return sum(compress(self._valores, self._tipos.tobytes().translate(tabela)))
+
+    def _faixa(self, inicio=None, fim=None):
+        # Índices [primeiro, último) das transações com inicio <= data < fim (em µs),
+        # por busca binária na coluna de datas, que é monotônica
+        primeiro = 0 if inicio is None else bisect_left(self._datas, inicio)
+        ultimo = len(self) if fim is None else bisect_left(self._datas, fim)
+        return primeiro, max(primeiro, ultimo)
+
+    def _posicoes_do_tipo(self, codigo):
+        # O índice por tipo é criado na primeira consulta e, a cada consulta,
+        # recebe só as transações acrescentadas desde a anterior (cada linha é
+        # indexada uma única vez, sem custo no caminho de depósitos e saques)
+        with _trava_indices:
+            if self._posicoes_por_tipo is None:
+                self._posicoes_por_tipo = {}
+            posicoes_por_tipo = self._posicoes_por_tipo
+            tipos = self._tipos
+            fim = len(self) # Linhas acrescentadas durante o laço ficam para a próxima consulta
+            for indice in range(self._posicoes_indexadas, fim):
+                posicoes = posicoes_por_tipo.get(tipos[indice])
+                if posicoes is None:
+                    posicoes = posicoes_por_tipo[tipos[indice]] = array("I")
+                posicoes.append(indice)
+            self._posicoes_indexadas = fim
+            return posicoes_por_tipo.get(codigo, ())
 
     def gerar_relatorio(self, tipo_transacao=None):
-        for transacao in self._transacoes:
-            if tipo_transacao is None or transacao["tipo"].lower() == tipo_transacao.lower():
-                yield transacao
+        """
+        Gera as transações, todas ou só as de um tipo ("Saque", "saque"...). Com
+        tipo, percorre apenas as posições daquele tipo no índice secundário.
+        """
+        if tipo_transacao is None:
+            for indice in range(len(self)):
+                yield RegistroTransacao(self, indice)
+            return
+        codigo = _CODIGOS_TIPO_NORMALIZADOS.get(tipo_transacao.lower())
+        if codigo is None:
+            return
+        posicoes = self._posicoes_do_tipo(codigo)
+        for ordem in range(len(posicoes)):
+            yield RegistroTransacao(self, posicoes[ordem])
+
+    def _atualizar_marcos(self):
+        # Como o índice por tipo, os marcos são acrescentados na consulta, só para
+        # os blocos completados desde a anterior (cada linha é somada uma única vez)
+        with _trava_indices:
+            if self._saldos_marco is None:
+                self._saldos_marco = array("q")
+            marcos = self._saldos_marco
+            intervalo = self.TRANSACOES_POR_MARCO
+            saldo = marcos[-1] if marcos else 0
+            fim = len(self) # Tamanho lido uma vez, como em _posicoes_do_tipo
+            for numero_bloco in range(len(marcos), fim // intervalo):
+                saldo += self._somar_com_sinal(numero_bloco * intervalo, (numero_bloco + 1) * intervalo)
+                marcos.append(saldo)
+            return marcos
+
+    def _somar_com_sinal(self, primeiro, ultimo):
+        sinais = _sinais_por_codigo()
+        tipos, valores = self._tipos, self._valores
+        return sum(sinais[tipos[indice]] * valores[indice] for indice in range(primeiro, ultimo))
+
+    def saldo_em(self, instante):
+        """
+        Saldo, em centavos, resultante das transações anteriores a `instante`
+        (datetime, date ou microssegundos; uma date significa o início do dia).
+        Acha a posição por busca binária e parte do marco de saldo mais próximo,
+        somando no máximo TRANSACOES_POR_MARCO - 1 transações.
+        """
+        _, fim = self._faixa(None, _limite_periodo(instante))
+        marcos = self._atualizar_marcos()
+        numero_bloco = min(fim // self.TRANSACOES_POR_MARCO, len(marcos))
+        saldo = marcos[numero_bloco - 1] if numero_bloco else 0
+        return saldo + self._somar_com_sinal(numero_bloco * self.TRANSACOES_POR_MARCO, fim)
+
+    def transacoes_no_periodo(self, inicio=None, fim=None, tipo_transacao=None):
+        """
+        Gera as transações com inicio <= data < fim (datetime, date ou microssegundos;
+        uma date em `fim` inclui o dia inteiro), opcionalmente só as de um tipo.
+        Em O(log n + k): os limites vêm de buscas binárias na coluna de datas e,
+        com tipo, também nas posições ordenadas do índice por tipo.
+        """
+        primeiro, ultimo = self._faixa(_limite_periodo(inicio), _limite_periodo(fim, fim=True))
+        if tipo_transacao is None:
+            for indice in range(primeiro, ultimo):
+                yield RegistroTransacao(self, indice)
+            return
+        codigo = _CODIGOS_TIPO_NORMALIZADOS.get(tipo_transacao.lower())
+        if codigo is None:
+            return
+        posicoes = self._posicoes_do_tipo(codigo)
+        for ordem in range(bisect_left(posicoes, primeiro), bisect_left(posicoes, ultimo)):
+            yield RegistroTransacao(self, posicoes[ordem])
 
     def transacoes_do_dia(self):
         """
         Retorna um gerador com todas as transações realizadas no dia atual.
         """
-        hoje = datetime.now().date() # Pega apenas a data atual
-        for transacao in self._transacoes:
-            # Converte a string de data da transação de volta para um objeto date para comparação
-            # Garante que a string de data tenha o formato esperado antes de fatiar
-            try:
-                data_transacao_obj = datetime.strptime(transacao["data"], "%d-%m-%Y %H:%M:%S").date()
-                if data_transacao_obj == hoje:
-                    yield transacao
-            except ValueError:
-                # Ignorar transações com formato de data inválido, ou logar o erro
-                print(f"@@@ Erro ao converter data de transação para filtro diário: {transacao['data']} @@@")
+        # As datas são monotônicas, então as transações de hoje formam o final da coluna
+        return self.transacoes_no_periodo(date.today())
+
+
+# ============ Extrato Paginado ============
+TAMANHO_PAGINA_EXTRATO = 20
+
+
+def formatar_transacao(transacao):
+    return (
+        f"\n{transacao['tipo']}:\n"
+        f"\t{formatar_moeda(transacao['valor'])}\n"
+        f"\tData: {formatar_data(transacao['data'])}\n"
+    )
+
+
+class Pagina:
+    """
+    Uma página de uma listagem (extrato, contas): as linhas já formatadas e o
+    cursor da página seguinte (None quando esta é a última).
+    """
+    __slots__ = ("linhas", "proximo_cursor")
+
+    def __init__(self, linhas, proximo_cursor):
+        self.linhas = linhas
+        self.proximo_cursor = proximo_cursor
+
+    def __str__(self):
+        return "".join(self.linhas)
+
+
+class CacheExtrato:
+    """
+    Cache LRU das linhas já formatadas do extrato, compartilhado por todas as contas.
+
+    As linhas ficam em blocos de `linhas_por_bloco` transações consecutivas de um
+    Histórico. Como o Histórico só recebe acréscimos, uma linha formatada nunca
+    fica desatualizada: rever um extrato só formata as transações novas, que
+    completam o último bloco ou abrem blocos novos. Quando o total passa de
+    `max_bytes`, os blocos usados há mais tempo (de qualquer conta) são descartados.
+    """
+    def __init__(self, max_bytes=16 * 2**20, linhas_por_bloco=64):
+        self.max_bytes = max_bytes
+        self.linhas_por_bloco = linhas_por_bloco
+        self.bytes = 0
+        self.acertos = 0 # Linhas entregues já formatadas
+        self.faltas = 0 # Linhas que precisaram ser formatadas
+        self.descartes = 0 # Blocos removidos pela política LRU
+        self._blocos = OrderedDict() # (historico, número do bloco) -> [linhas]
+        self._trava = threading.Lock()
+
+    def linhas(self, historico, primeiro, ultimo):
+        """
+        Retorna as linhas formatadas das transações [primeiro, ultimo) do Histórico.
+        """
+        resultado = []
+        por_bloco = self.linhas_por_bloco
+        with self._trava:
+            while primeiro < ultimo:
+                numero_bloco, deslocamento = divmod(primeiro, por_bloco)
+                inicio_bloco = numero_bloco * por_bloco
+                fim = min(inicio_bloco + por_bloco, ultimo)
+                chave = (historico, numero_bloco)
+                bloco = self._blocos.get(chave)
+                if bloco is None:
+                    bloco = self._blocos[chave] = []
+                else:
+                    self._blocos.move_to_end(chave)
+
+                prontas = len(bloco)
+                if prontas < fim - inicio_bloco:
+                    novas = [
+                        formatar_transacao(RegistroTransacao(historico, indice))
+                        for indice in range(inicio_bloco + prontas, fim)
+                    ]
+                    bloco.extend(novas)
+                    self.bytes += sum(map(sys.getsizeof, novas))
+                    self.faltas += len(novas)
+                self.acertos += max(0, min(prontas, fim - inicio_bloco) - deslocamento)
+                resultado.extend(bloco[deslocamento:fim - inicio_bloco])
+                primeiro = fim
+            self._descartar()
+        return resultado
+
+    def _descartar(self):
+        while self.bytes > self.max_bytes and self._blocos:
+            _, bloco = self._blocos.popitem(last=False)
+            self.bytes -= sum(map(sys.getsizeof, bloco))
+            self.descartes += 1
+
+    def limpar(self):
+        with self._trava:
+            self._blocos.clear()
+            self.bytes = 0
+
+    @property
+    def taxa_acerto(self):
+        total = self.acertos + self.faltas
+        return self.acertos / total if total else 0.0
+
+    def estatisticas(self):
+        return {
+            "acertos": self.acertos, "faltas": self.faltas, "taxa_acerto": self.taxa_acerto,
+            "blocos": len(self._blocos), "descartes": self.descartes,
+            "bytes": self.bytes, "max_bytes": self.max_bytes,
+        }
+
+    def __repr__(self):
+        return (
+            f"<CacheExtrato: {len(self._blocos)} blocos, {self.bytes / 2**20:.1f}/{self.max_bytes / 2**20:.0f} MiB, "
+            f"acerto {self.taxa_acerto:.1%}>"
+        )
+
+
+_cache_extrato = CacheExtrato()
+
+
+def configurar_cache_extrato(cache):
+    """
+    Define o cache de linhas do extrato (None desativa o cache).
+    """
+    global _cache_extrato
+    _cache_extrato = cache
+
+
+def _limite_periodo(momento, fim=False):
+    # datetime, date ou microssegundos -> microssegundos; uma date no fim inclui o dia inteiro
+    if momento is None or isinstance(momento, int):
+        return momento
+    if not isinstance(momento, datetime):
+        momento = datetime.combine(momento + timedelta(days=1) if fim else momento, datetime.min.time())
+    return para_microssegundos(momento)
+
+
+def paginas_extrato(historico, tamanho_pagina=TAMANHO_PAGINA_EXTRATO, cursor=None, inicio=None, fim=None):
+    """
+    Gera o extrato em páginas de até `tamanho_pagina` transações, formatando só
+    a página da vez. Para continuar depois, passe em `cursor` o proximo_cursor da
+    última página recebida. `inicio` e `fim` limitam o período (datetime, date ou
+    microssegundos; `fim` é exclusivo, mas uma date inclui o dia inteiro).
+
+    O começo do período é achado por busca binária, então o tempo até a primeira
+    linha não depende do tamanho do Histórico. As linhas já formatadas vêm do
+    cache do extrato (veja CacheExtrato).
+    """
+    primeiro, ultimo = historico._faixa(_limite_periodo(inicio), _limite_periodo(fim, fim=True))
+    if cursor is not None:
+        primeiro = max(primeiro, cursor)
+    while primeiro < ultimo:
+        proximo = min(primeiro + tamanho_pagina, ultimo)
+        if _cache_extrato is not None:
+            linhas = _cache_extrato.linhas(historico, primeiro, proximo)
+        else:
+            linhas = [formatar_transacao(RegistroTransacao(historico, indice)) for indice in range(primeiro, proximo)]
+        yield Pagina(linhas, proximo if proximo < ultimo else None)
+        primeiro = proximo
+
+
+# ============ Histórico em Arquivo Mapeado em Memória ============
+class RazaoMapeado:
+    """
+    Arquivo de razão (ledger) com registros de largura fixa, mapeado em memória
+    com mmap e compartilhado pelos históricos de um fragmento (agência, shard...).
+    O espaço é dividido em blocos de `registros_por_bloco` registros; cada Histórico
+    recebe blocos sob demanda. O cache de páginas do sistema operacional decide o
+    que fica em memória.
+
+    O arquivo é uma área de trabalho da execução atual (é recriado ao abrir): a
+    fonte de verdade persistente continua sendo o DiarioBancario.
+    """
+    # valor em centavos (8 bytes), data em microssegundos (8 bytes), tipo (1 byte) + 7 de alinhamento
+    REGISTRO = struct.Struct("<qqB7x")
+    CAMPO_VALOR = struct.Struct("<q")
+    CAMPO_DATA = struct.Struct("<8xq")
+    CAMPO_TIPO = struct.Struct("<16xB")
+
+    def __init__(self, caminho, registros_por_bloco=256, blocos_iniciais=1024):
+        self.caminho = caminho
+        self.registros_por_bloco = registros_por_bloco
+        self.tamanho_bloco = registros_por_bloco * self.REGISTRO.size
+        self._proximo_bloco = 0
+        self._capacidade_blocos = blocos_iniciais
+        self._trava = threading.Lock()
+        self._arquivo = open(caminho, "w+b")
+        self._arquivo.truncate(self._capacidade_blocos * self.tamanho_bloco)
+        self._mapear()
+
+    def _mapear(self):
+        # Um novo mapeamento é criado a cada crescimento; fatias de memoryview ainda
+        # em uso continuam válidas sobre o mapeamento antigo (mesmas páginas do arquivo)
+        self._mapa = mmap.mmap(self._arquivo.fileno(), self._capacidade_blocos * self.tamanho_bloco)
+        self.visao = memoryview(self._mapa)
+
+    def alocar_bloco(self):
+        with self._trava:
+            if self._proximo_bloco == self._capacidade_blocos:
+                self._capacidade_blocos *= 2 # Crescimento amortizado: dobra o arquivo
+                self._arquivo.truncate(self._capacidade_blocos * self.tamanho_bloco)
+                self._mapear()
+            bloco = self._proximo_bloco
+            self._proximo_bloco += 1
+            return bloco
+
+    def sincronizar(self):
+        self._mapa.flush()
+
+    def fechar(self):
+        self.visao.release()
+        self._mapa.close()
+        self._arquivo.close()
+
+
+class _ColunaMapeada:
+    """
+    Coluna de um HistoricoMapeado com a mesma interface usada nas colunas array
+    (len, índice, bisect, tobytes), lendo cada campo sem cópia do arquivo mapeado.
+    """
+    __slots__ = ("_historico", "_campo", "_codigo_array")
+
+    def __init__(self, historico, campo, codigo_array):
+        self._historico = historico
+        self._campo = campo
+        self._codigo_array = codigo_array
+
+    def __len__(self):
+        return self._historico._tamanho
+
+    def __getitem__(self, indice):
+        historico = self._historico
+        if indice < 0:
+            indice += historico._tamanho
+        if not 0 <= indice < historico._tamanho:
+            raise IndexError("índice de transação fora do intervalo")
+        razao = historico._razao
+        return self._campo.unpack_from(razao.visao, historico._deslocamento(indice))[0]
+
+    def tobytes(self):
+        return array(self._codigo_array, (self[i] for i in range(len(self)))).tobytes()
+
+
+class HistoricoMapeado(Historico):
+    """
+    Histórico cujas transações ficam num RazaoMapeado, fora do heap do Python.
+    Em memória ficam apenas os números dos blocos da conta (8 bytes a cada
+    `registros_por_bloco` transações). A API é a mesma do Histórico colunar.
+    """
+    __slots__ = ("_razao", "_blocos", "_tamanho")
+
+    def __init__(self, razao):
+        super().__init__()
+        self._razao = razao
+        self._blocos = array("q")
+        self._tamanho = 0
+        self._tipos = _ColunaMapeada(self, RazaoMapeado.CAMPO_TIPO, "B")
+        self._valores = _ColunaMapeada(self, RazaoMapeado.CAMPO_VALOR, "q")
+        self._datas = _ColunaMapeada(self, RazaoMapeado.CAMPO_DATA, "q")
+
+    def __len__(self):
+        return self._tamanho
+
+    def _deslocamento(self, indice):
+        razao = self._razao
+        bloco, posicao = divmod(indice, razao.registros_por_bloco)
+        return self._blocos[bloco] * razao.tamanho_bloco + posicao * RazaoMapeado.REGISTRO.size
+
+    def _anexar(self, codigo_tipo, centavos, data):
+        if self._tamanho == len(self._blocos) * self._razao.registros_por_bloco:
+            self._blocos.append(self._razao.alocar_bloco())
+        RazaoMapeado.REGISTRO.pack_into(self._razao.visao, self._deslocamento(self._tamanho), centavos, data, codigo_tipo)
+        self._tamanho += 1
+        self._ultima_data = data
+
+    def _restaurar(self, tipos, valores, datas):
+        self._blocos = array("q")
+        self._tamanho = 0
+        self._posicoes_por_tipo = None
+        self._posicoes_indexadas = 0
+        self._saldos_marco = None
+        for codigo_tipo, centavos, data in zip(tipos, valores, datas):
+            self._anexar(codigo_tipo, centavos, data)
+
+    def total(self, tipo_transacao=None):
+        codigo = None if tipo_transacao is None else _CODIGOS_TIPO_TRANSACAO.get(tipo_transacao)
+        if tipo_transacao is not None and codigo is None:
+            return 0
+        return sum(
+            centavos for centavos, _, codigo_tipo in self.registros()
+            if codigo is None or codigo_tipo == codigo
+        )
+
+    def registros(self, inicio=0, fim=None):
+        """
+        Percorre as transações como tuplas (valor em centavos, data, código do tipo),
+        desempacotadas diretamente de fatias de memoryview do arquivo mapeado.
+        """
+        fim = self._tamanho if fim is None else min(fim, self._tamanho)
+        razao = self._razao
+        tamanho_registro = RazaoMapeado.REGISTRO.size
+        while inicio < fim:
+            bloco, posicao = divmod(inicio, razao.registros_por_bloco)
+            quantidade = min(razao.registros_por_bloco - posicao, fim - inicio)
+            deslocamento = self._blocos[bloco] * razao.tamanho_bloco + posicao * tamanho_registro
+            fatia = razao.visao[deslocamento:deslocamento + quantidade * tamanho_registro]
+            yield from RazaoMapeado.REGISTRO.iter_unpack(fatia)
+            inicio += quantidade
+
+
+class FabricaHistoricoMapeado:
+    """
+    Cria HistoricoMapeado para as contas, com um arquivo de razão por agência
+    (ou por fragmento, se `fragmentos` for informado) dentro de `pasta`.
+    """
+    def __init__(self, pasta, fragmentos=None, **opcoes_razao):
+        os.makedirs(pasta, exist_ok=True)
+        self.pasta = pasta
+        self.fragmentos = fragmentos
+        self.opcoes_razao = opcoes_razao
+        self.razoes = {}
+
+    def __call__(self, conta):
+        if self.fragmentos is None:
+            chave = f"agencia_{conta.agencia}"
+        else:
+            # Mesma partição estável do MotorFragmentado (hash() muda a cada processo)
+            chave = f"fragmento_{fragmento_da_conta(conta.agencia, conta.numero, self.fragmentos)}"
+        razao = self.razoes.get(chave)
+        if razao is None:
+            razao = RazaoMapeado(os.path.join(self.pasta, f"{chave}.razao"), **self.opcoes_razao)
+            self.razoes[chave] = razao
+        return HistoricoMapeado(razao)
+
+    def fechar(self):
+        for razao in self.razoes.values():
+            razao.fechar()
+
+
+def _historico_em_memoria(conta):
+    return Historico()
+
+
+_fabrica_historico = _historico_em_memoria
+
+
+def configurar_historico(fabrica):
+    """
+    Define como as contas criam o seu Histórico: uma função que recebe a conta e
+    devolve o Histórico (por exemplo, FabricaHistoricoMapeado(pasta)). None volta
+    ao Histórico colunar em memória.
+    """
+    global _fabrica_historico
+    _fabrica_historico = fabrica or _historico_em_memoria
 
 
 class Transacao(ABC):
+    __slots__ = ()
+
     @property
     @abstractproperty
     def valor(self):
+        # Valor da transação em centavos (int)
         pass
 
     @abstractclassmethod
     def registrar(self, conta):
         pass
 
+    @classmethod
+    def _efetivar(cls, conta, valor, data=None, hoje=None):
+        # Único caminho de escrita de uma transação já validada, usado por Conta.sacar/
+        # depositar (e assim por registrar) e por processar_lote, com a trava da conta
+        # adquirida. A linha entra no Histórico antes de o saldo mudar, então uma falha
+        # ao gravá-la não deixa saldo sem linha; depois vai o evento para o diário.
+        if data is None:
+            agora = datetime.now()
+            data, hoje = para_microssegundos(agora), agora.date()
+        conta.historico._adicionar(cls.__name__, valor, data, hoje)
+        conta._saldo += cls.sinal * valor
+        if _diario_ativo is not None:
+            _diario_ativo.registrar_transacao(conta)
+
 
 class Saque(Transacao):
+    __slots__ = ("_valor",)
+    sinal = -1 # Efeito da transação sobre o saldo
+
     def __init__(self, valor):
         self._valor = valor
 
@@ -293,14 +1566,14 @@ class Saque(Transacao):
 
     def registrar(self, conta):
         # A validação do limite diário foi movida para ContaCorrente.sacar
-        sucesso_transacao = conta.sacar(self.valor) 
-
-        if sucesso_transacao:
-            conta.historico.adicionar_transacao(self)
-        return sucesso_transacao
+        with conta.trava:
+            return conta.sacar(self.valor)
 
 
 class Deposito(Transacao):
+    __slots__ = ("_valor",)
+    sinal = 1
+
     def __init__(self, valor):
         self._valor = valor
 
@@ -310,11 +1583,1050 @@ class Deposito(Transacao):
 
     def registrar(self, conta):
         # A validação do limite diário foi movida para ContaCorrente.depositar
-        sucesso_transacao = conta.depositar(self.valor)
+        with conta.trava:
+            return conta.depositar(self.valor)
+
+
+# ============ Persistência: Diário e Snapshots ============
+# Cada evento bem-sucedido (novo cliente, nova conta, depósito, saque) é anexado ao
+# diário como uma linha JSON. De tempos em tempos o estado completo é gravado num
+# snapshot compacto e um novo diário é iniciado; a recuperação carrega o último
+# snapshot e reaplica só o diário posterior a ele.
+#
+# Os arquivos de uma geração g são "snapshot.pkl" (que registra g) e "diario.<g>.log".
+# A recuperação reaplica o diário da geração do snapshot e os de gerações seguintes.
+# A reaplicação é idempotente (cada transação leva a sua posição no Histórico da conta,
+# e clientes/contas já existentes são ignorados), então eventos que também entraram
+# no snapshot, por terem ocorrido durante a gravação dele, nunca são aplicados em dobro.
+_diario_ativo = None
+
+_EVENTO_CLIENTE = "c"
+_EVENTO_CONTA = "a"
+_EVENTO_TRANSACAO = "t"
+
+
+def configurar_diario(diario):
+    """
+    Define o diário que recebe os eventos do domínio (None desativa a persistência).
+    """
+    global _diario_ativo
+    _diario_ativo = diario
 
-        if sucesso_transacao:
-            conta.historico.adicionar_transacao(self)
-        return sucesso_transacao
+
+def classe_transacao(nome_tipo):
+    for classe in Transacao.__subclasses__():
+        if classe.__name__ == nome_tipo:
+            return classe
+    raise ValueError(f"Tipo de transação desconhecido: {nome_tipo!r}")
+
+
+class DiarioBancario:
+    """
+    Diário somente de acréscimo (append-only) com snapshots periódicos do estado.
+    Use DiarioBancario.recuperar() para abrir uma pasta de dados.
+    """
+    def __init__(self, pasta, clientes, contas, geracao=0, snapshot_a_cada=1_000_000, gravar_a_cada=1):
+        self.pasta = pasta
+        self.clientes = clientes
+        self.contas = contas
+        self.geracao = geracao
+        self.snapshot_a_cada = snapshot_a_cada
+        # Quantos eventos ficam no buffer antes de ir para o sistema operacional
+        self.gravar_a_cada = gravar_a_cada
+        self.eventos_desde_snapshot = 0
+        self._pendentes = 0
+        self._trava = threading.Lock() # Serializa as escritas vindas de várias threads
+        self._gravando_snapshot = threading.Lock()
+        self._arquivo = open(self._caminho_diario(geracao), "a", encoding="utf-8")
+
+    def _caminho_diario(self, geracao):
+        return os.path.join(self.pasta, f"diario.{geracao}.log")
+
+    @staticmethod
+    def _caminho_snapshot(pasta):
+        return os.path.join(pasta, "snapshot.pkl")
+
+    # ----- Escrita -----
+    def registrar_cliente(self, cliente):
+        self._escrever([_EVENTO_CLIENTE, cliente.cpf, cliente.nome, cliente.data_nascimento, cliente.endereco])
+
+    def registrar_conta(self, conta):
+        self._escrever([
+            _EVENTO_CONTA, conta.cliente.cpf, conta.agencia, conta.numero,
+            conta.limite, conta.limite_saques, conta.limite_transacoes_diarias,
+        ])
+
+    def registrar_transacao(self, conta):
+        # Registra a última linha do Histórico da conta, exatamente como foi gravada,
+        # junto com a sua posição (chamado com a trava da conta adquirida)
+        historico = conta.historico
+        self._escrever([
+            _EVENTO_TRANSACAO, conta.agencia, conta.numero,
+            NOMES_TIPO_TRANSACAO[historico._tipos[-1]], historico._valores[-1], historico._datas[-1],
+            len(historico) - 1,
+        ])
+
+    def _escrever(self, evento):
+        linha = json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._trava:
+            self._arquivo.write(linha)
+            self._pendentes += 1
+            if self._pendentes >= self.gravar_a_cada:
+                self._sincronizar()
+            self.eventos_desde_snapshot += 1
+            snapshot_devido = self.eventos_desde_snapshot >= self.snapshot_a_cada
+        if snapshot_devido:
+            self.gravar_snapshot()
+
+    def sincronizar(self, fsync=False):
+        with self._trava:
+            self._sincronizar(fsync)
+
+    def _sincronizar(self, fsync=False):
+        self._arquivo.flush()
+        if fsync:
+            os.fsync(self._arquivo.fileno())
+        self._pendentes = 0
+
+    # ----- Snapshots -----
+    def gravar_snapshot(self):
+        """
+        Grava o estado completo numa nova geração e descarta o diário anterior.
+        Pode ser chamado com outras threads operando: os novos eventos já vão para
+        o diário da nova geração enquanto o estado é lido, conta a conta, sob a
+        trava de cada uma.
+        """
+        if not self._gravando_snapshot.acquire(blocking=False):
+            return # Outra thread já está gravando um snapshot
+        try:
+            with self._trava:
+                geracao_anterior = self.geracao
+                self._sincronizar(fsync=True)
+                self._arquivo.close()
+                self.geracao += 1
+                self._arquivo = open(self._caminho_diario(self.geracao), "a", encoding="utf-8")
+                self.eventos_desde_snapshot = 0
+
+            # Contas antes dos clientes: o cliente de uma conta é sempre cadastrado antes
+            # dela, e os titulares das contas copiadas entram mesmo se o cadastro for
+            # alterado no meio da cópia, então nenhuma conta fica sem cliente no snapshot
+            contas = list(self.contas)
+            clientes = {cliente.cpf: cliente for cliente in list(self.clientes)}
+            for conta in contas:
+                clientes.setdefault(conta.cliente.cpf, conta.cliente)
+            estado = {
+                "geracao": self.geracao,
+                "tipos_transacao": list(NOMES_TIPO_TRANSACAO),
+                "clientes": [
+                    (cliente.cpf, cliente.nome, cliente.data_nascimento, cliente.endereco)
+                    for cliente in clientes.values()
+                ],
+                "contas": [self._estado_conta(conta) for conta in contas],
+            }
+
+            caminho = self._caminho_snapshot(self.pasta)
+            with open(caminho + ".tmp", "wb") as f:
+                pickle.dump(estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(caminho + ".tmp", caminho)
+            os.remove(self._caminho_diario(geracao_anterior))
+        finally:
+            self._gravando_snapshot.release()
+
+    @staticmethod
+    def _estado_conta(conta):
+        with conta.trava:
+            historico = conta.historico
+            return (
+                conta.cliente.cpf, conta.agencia, conta.numero, conta.saldo,
+                conta.limite, conta.limite_saques, conta.limite_transacoes_diarias,
+                historico._tipos.tobytes(), historico._valores.tobytes(), historico._datas.tobytes(),
+            )
+
+    def fechar(self):
+        with self._trava:
+            self._sincronizar(fsync=True)
+            self._arquivo.close()
+
+    # ----- Recuperação -----
+    @classmethod
+    def recuperar(cls, pasta, **opcoes):
+        """
+        Reconstrói clientes e contas a partir do último snapshot e do diário
+        posterior a ele. Retorna (diario, clientes, contas).
+        """
+        os.makedirs(pasta, exist_ok=True)
+        clientes = ClienteRegistry()
+        contas = IndiceContas()
+        geracao = 0
+
+        caminho_snapshot = cls._caminho_snapshot(pasta)
+        if os.path.exists(caminho_snapshot):
+            with open(caminho_snapshot, "rb") as f:
+                estado = pickle.load(f)
+            geracao = estado["geracao"]
+            for cpf, nome, data_nascimento, endereco in estado["clientes"]:
+                clientes.adicionar(PessoaFisica(nome=nome, data_nascimento=data_nascimento, cpf=cpf, endereco=endereco))
+
+            # Os códigos de tipo podem diferir entre execuções: traduz pelos nomes
+            traducao = bytes(codigo_tipo_transacao(nome) for nome in estado["tipos_transacao"])
+            traducao += bytes(range(len(traducao), 256))
+            for (cpf, agencia, numero, saldo, limite, limite_saques, limite_transacoes,
+                 tipos, valores, datas) in estado["contas"]:
+                conta = cls._restaurar_conta(clientes, cpf, agencia, numero, limite, limite_saques, limite_transacoes)
+                conta._saldo = saldo
+                conta.historico._restaurar(
+                    array("B", tipos.translate(traducao)), array("q", valores), array("q", datas)
+                )
+                contas.append(conta)
+
+        # Diário da geração do snapshot e de gerações seguintes (uma queda durante a
+        # gravação de um snapshot deixa o diário da geração nova sem snapshot próprio)
+        geracoes = sorted(
+            int(nome.split(".")[1]) for nome in os.listdir(pasta)
+            if nome.startswith("diario.") and nome.endswith(".log")
+        )
+        geracao_snapshot = geracao
+        for geracao_diario in geracoes:
+            if geracao_diario >= geracao_snapshot:
+                cls._reaplicar_diario(os.path.join(pasta, f"diario.{geracao_diario}.log"), clientes, contas)
+                geracao = geracao_diario
+        hoje = date.today()
+        inicio_do_dia = para_microssegundos(datetime.combine(hoje, datetime.min.time()))
+        for conta in contas:
+            if conta._historico is not None:
+                conta._historico._recalcular_contagem_do_dia(hoje, inicio_do_dia)
+
+        # Remove diários de gerações antigas que uma queda possa ter deixado para trás
+        for geracao_diario in geracoes:
+            if geracao_diario < geracao_snapshot:
+                os.remove(os.path.join(pasta, f"diario.{geracao_diario}.log"))
+
+        return cls(pasta, clientes, contas, geracao=geracao, **opcoes), clientes, contas
+
+    @staticmethod
+    def _restaurar_conta(clientes, cpf, agencia, numero, limite, limite_saques, limite_transacoes):
+        cliente = clientes.buscar(cpf)
+        conta = ContaCorrente.nova_conta(cliente=cliente, numero=numero, limite=limite, limite_saques=limite_saques)
+        conta._agencia = agencia
+        conta.limite_transacoes_diarias = limite_transacoes
+        cliente.contas.append(conta)
+        return conta
+
+    @classmethod
+    def _reaplicar_diario(cls, caminho, clientes, contas):
+        if not os.path.exists(caminho):
+            return
+        with open(caminho, "r+", encoding="utf-8") as f:
+            posicao_valida = 0
+            for linha in f:
+                try:
+                    evento = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Linha incompleta deixada por uma queda durante a escrita: descarta o resto
+                    break
+                posicao_valida += len(linha.encode("utf-8"))
+
+                if evento[0] == _EVENTO_TRANSACAO:
+                    _, agencia, numero, nome_tipo, centavos, data, posicao = evento
+                    conta = contas.buscar(agencia, numero)
+                    if posicao < len(conta.historico):
+                        continue # Já incluída no snapshot
+                    # Reaplica o efeito já validado na época, sem repetir as validações de limite
+                    conta._saldo += classe_transacao(nome_tipo).sinal * centavos
+                    conta.historico._anexar(codigo_tipo_transacao(nome_tipo), centavos, data)
+                elif evento[0] == _EVENTO_CONTA:
+                    _, cpf, agencia, numero, limite, limite_saques, limite_transacoes = evento
+                    if (agencia, numero) in contas:
+                        continue
+                    conta = cls._restaurar_conta(clientes, cpf, agencia, numero, limite, limite_saques, limite_transacoes)
+                    contas.append(conta)
+                elif evento[0] == _EVENTO_CLIENTE:
+                    _, cpf, nome, data_nascimento, endereco = evento
+                    clientes.adicionar(PessoaFisica(nome=nome, data_nascimento=data_nascimento, cpf=cpf, endereco=endereco))
+            f.truncate(posicao_valida)
+
+
+# ============ Numeração de Contas ============
+# Cada processo reserva no arquivo do alocador um bloco de números de uma vez e
+# distribui os números do bloco sem tocar no disco. O arquivo guarda o primeiro
+# número ainda não reservado por ninguém, então números nunca se repetem, nem entre
+# processos nem depois de reiniciar; números reservados e não usados viram lacunas.
+class AlocadorNumeros:
+    """
+    Alocador de números de conta seguro entre threads (trava interna) e entre
+    processos (flock no arquivo `caminho`). Sem `caminho`, os números ficam só na
+    memória do processo. `minimo` é o menor número que pode ser entregue (por
+    exemplo, o maior número já existente + 1 ao abrir dados antigos).
+    """
+    def __init__(self, caminho=None, tamanho_bloco=100, minimo=1):
+        self.caminho = caminho
+        self.tamanho_bloco = tamanho_bloco
+        self.minimo = minimo
+        self._proximo = 0
+        self._fim_bloco = 0 # Primeiro número fora do bloco reservado
+        self._trava = threading.Lock()
+
+    def proximo(self):
+        with self._trava:
+            if self._proximo >= self._fim_bloco:
+                self._proximo, self._fim_bloco = self._reservar_bloco()
+            numero = self._proximo
+            self._proximo += 1
+            return numero
+
+    def devolver_sobra(self):
+        """
+        Devolve ao arquivo os números não usados do bloco atual, se nenhum outro
+        processo reservou números depois dele (chamado no encerramento, evita
+        lacunas a cada reinício).
+        """
+        with self._trava:
+            if self.caminho is None or self._proximo >= self._fim_bloco:
+                return
+            fim_bloco, proximo = self._fim_bloco, self._proximo
+            self._atualizar_arquivo(lambda primeiro_livre: proximo if primeiro_livre == fim_bloco else primeiro_livre)
+            self._fim_bloco = self._proximo
+
+    def _reservar_bloco(self):
+        if self.caminho is None:
+            inicio = max(self._fim_bloco, self.minimo)
+            return inicio, inicio + self.tamanho_bloco
+        inicio = self._atualizar_arquivo(lambda primeiro_livre: max(primeiro_livre, self.minimo) + self.tamanho_bloco)
+        inicio = max(inicio, self.minimo)
+        return inicio, inicio + self.tamanho_bloco
+
+    def _atualizar_arquivo(self, calcular):
+        # Sob flock: lê o primeiro número livre, grava calcular(lido) e retorna o lido
+        descritor = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(descritor, fcntl.LOCK_EX)
+            conteudo = os.read(descritor, 32).strip()
+            primeiro_livre = int(conteudo) if conteudo else 0
+            os.lseek(descritor, 0, os.SEEK_SET)
+            os.ftruncate(descritor, 0)
+            os.write(descritor, f"{calcular(primeiro_livre)}\n".encode())
+            os.fsync(descritor) # Um bloco só é usado depois de registrado em disco
+        finally:
+            os.close(descritor) # Fechar também libera o flock
+        return primeiro_livre
+
+
+_alocador_ativo = None
+
+
+def configurar_alocador(alocador):
+    """
+    Define o alocador usado para numerar contas novas (None volta a numerar pelo
+    tamanho da lista de contas, o que só é seguro com um único processo e thread).
+    """
+    global _alocador_ativo
+    _alocador_ativo = alocador
+
+
+def alocar_numero_conta(contas):
+    if _alocador_ativo is None:
+        return len(contas) + 1
+    return _alocador_ativo.proximo()
+
+
+# ============ Verificação de Invariantes ============
+def verificar_invariantes(contas):
+    """
+    Confere, para cada conta, que o saldo não é negativo e que ele é igual à soma
+    das transações do Histórico (uma atualização perdida quebraria essa igualdade).
+    Retorna a lista de problemas encontrados (vazia se tudo estiver correto).
+    """
+    problemas = []
+    classes = Transacao.__subclasses__()
+    for conta in contas:
+        with conta.trava:
+            saldo = conta.saldo
+            historico = conta.historico
+            centavos = sum(classe.sinal * historico.total(classe.__name__) for classe in classes)
+        if saldo < 0:
+            problemas.append(f"Conta {conta.agencia}/{conta.numero}: saldo negativo ({formatar_moeda(saldo)})")
+        if saldo != centavos:
+            problemas.append(
+                f"Conta {conta.agencia}/{conta.numero}: saldo {formatar_moeda(saldo)} "
+                f"difere do Histórico ({formatar_moeda(centavos)})"
+            )
+    return problemas
+
+
+# ============ Processamento em Lote ============
+_TIPOS_LOTE = {
+    "d": Deposito, "deposito": Deposito, "depósito": Deposito,
+    "s": Saque, "saque": Saque,
+}
+
+
+def _indexar_contas(contas):
+    # Mapa número -> conta e (agência, número) -> conta; IndiceContas já é esse mapa
+    if isinstance(contas, IndiceContas):
+        return contas
+    contas_por_chave = {}
+    for conta in contas:
+        contas_por_chave[conta.numero] = conta
+        contas_por_chave[(conta.agencia, conta.numero)] = conta
+    return contas_por_chave
+
+
+def _resolver_conta(identificador, clientes, contas, contas_por_chave):
+    # CPF (str) -> conta única do cliente; número da conta (int) ou (agência, número) -> conta
+    if isinstance(identificador, (int, tuple)):
+        if contas_por_chave is None:
+            return None, MOTIVO_CONTA_NAO_ENCONTRADA
+        conta = contas_por_chave.get(identificador)
+        return (conta, None) if conta else (None, MOTIVO_CONTA_NAO_ENCONTRADA)
+    cliente = filtrar_cliente(identificador, clientes)
+    if not cliente:
+        return None, MOTIVO_CLIENTE_NAO_ENCONTRADO
+    if not cliente.contas:
+        return None, MOTIVO_CONTA_NAO_ENCONTRADA
+    if len(cliente.contas) > 1:
+        return None, MOTIVO_CONTA_AMBIGUA
+    return cliente.contas[0], None
+
+
+def processar_lote(itens, clientes, contas, contas_por_chave=None):
+    """
+    Processa de uma vez uma sequência de tuplas (identificador, tipo, valor), onde o
+    identificador é o CPF (str), o número da conta (int) ou (agência, número), e o
+    tipo é "d"/"deposito" ou "s"/"saque" e o valor está em centavos. Retorna uma lista com o resultado de cada
+    item, na mesma ordem: RESULTADO_SUCESSO ou o motivo da recusa.
+
+    `contas_por_chave` é um mapa já montado de número e (agência, número) para a
+    conta; sem ele, usa `contas` quando ela é um IndiceContas, ou monta o mapa a
+    partir da lista quando for necessário.
+
+    Os itens são agrupados por conta e as contagens do dia de cada conta são lidas
+    uma única vez. Dentro de cada conta a ordem original é mantida, então cada item
+    é aceito ou recusado exatamente como seria numa chamada a Transacao.registrar,
+    só que sem mensagens no terminal.
+    """
+    resolvidos = {} # Identificadores repetidos no lote são resolvidos uma única vez
+    resultados = []
+    grupos = {}
+
+    for posicao, (identificador, tipo, valor) in enumerate(itens):
+        resultados.append(None)
+        classe = _TIPOS_LOTE.get(str(tipo).lower())
+        if classe is None:
+            resultados[posicao] = MOTIVO_TIPO_INVALIDO
+            continue
+        resolucao = resolvidos.get(identificador)
+        if resolucao is None:
+            if contas_por_chave is None and isinstance(identificador, (int, tuple)):
+                # Mapa por número montado só quando o lote usa números de conta
+                contas_por_chave = _indexar_contas(contas)
+            resolucao = resolvidos[identificador] = _resolver_conta(identificador, clientes, contas, contas_por_chave)
+        conta, motivo = resolucao
+        if motivo:
+            resultados[posicao] = motivo
+            continue
+        grupos.setdefault(conta, []).append((posicao, classe, valor))
+
+    # Um único instante para todo o lote, em vez de consultar o relógio a cada item
+    agora = datetime.now()
+    data, hoje = para_microssegundos(agora), agora.date()
+
+    for conta, operacoes in grupos.items():
+        with conta.trava:
+            _processar_operacoes_da_conta(conta, operacoes, resultados, data, hoje)
+
+    return resultados
+
+
+def _processar_operacoes_da_conta(conta, operacoes, resultados, data, hoje):
+    # Chamada com a trava da conta já adquirida
+    historico = conta.historico
+    transacoes_hoje = historico.quantidade_transacoes_do_dia(hoje=hoje)
+    saques_hoje = historico.quantidade_transacoes_do_dia(Saque.__name__, hoje=hoje)
+
+    for posicao, classe, valor in operacoes:
+        if classe is Saque:
+            motivo = conta.validar_saque(valor, transacoes_hoje, saques_hoje)
+        else:
+            motivo = conta.validar_deposito(valor)
+        if motivo:
+            resultados[posicao] = motivo
+            continue
+
+        classe._efetivar(conta, valor, data, hoje)
+        transacoes_hoje += 1
+        if classe is Saque:
+            saques_hoje += 1
+        resultados[posicao] = RESULTADO_SUCESSO
+
+
+# ============ Importação de Transações em CSV ============
+class RelatorioImportacao:
+    def __init__(self):
+        self.linhas = 0
+        self.aplicadas = 0
+        self.rejeitadas = 0
+        self.segundos = 0.0
+
+    @property
+    def linhas_por_segundo(self):
+        return self.linhas / self.segundos if self.segundos else 0.0
+
+    def __str__(self):
+        return (
+            f"Linhas lidas: {self.linhas} | aplicadas: {self.aplicadas} | rejeitadas: {self.rejeitadas} | "
+            f"{self.segundos:.2f} s ({self.linhas_por_segundo:,.0f} linhas/s)"
+        )
+
+
+def _item_da_linha(linha):
+    # Converte uma linha do CSV em item de processar_lote, ou retorna o motivo da recusa
+    numero_conta = (linha.get("conta") or "").strip()
+    cpf = (linha.get("cpf") or "").strip()
+    tipo = (linha.get("tipo") or "").strip().lower()
+    if not (numero_conta or cpf) or linha.get("valor") is None:
+        return None, MOTIVO_LINHA_INVALIDA
+    # isdecimal, não isdigit: "²" é dígito para o Unicode, mas int() o recusa
+    if numero_conta and not numero_conta.isdecimal():
+        return None, MOTIVO_CONTA_NAO_ENCONTRADA
+    if tipo not in _TIPOS_LOTE:
+        return None, MOTIVO_TIPO_INVALIDO
+
+    valor = converter_valor(linha["valor"])
+    if valor is None:
+        return None, MOTIVO_VALOR_INVALIDO
+    # A regra das cédulas de ContaCorrente.validar_saque é conferida já na leitura
+    if _TIPOS_LOTE[tipo] is Saque and valor % 500 != 0:
+        return None, MOTIVO_NAO_MULTIPLO_DE_5
+    return (int(numero_conta) if numero_conta else cpf, tipo, valor), None
+
+
+def importar_csv(caminho, clientes, contas, caminho_rejeitos=None, tamanho_bloco=10_000):
+    """
+    Importa depósitos e saques de um arquivo CSV com cabeçalho contendo "tipo",
+    "valor" e "cpf" e/ou "conta" (número da conta, que tem precedência).
+
+    O arquivo é lido em blocos de `tamanho_bloco` linhas, cada bloco aplicado com
+    processar_lote (mesmas regras de Transacao.registrar), então a memória usada
+    não depende do tamanho do arquivo. As linhas recusadas vão para o arquivo de
+    rejeitos (padrão: "<arquivo>.rejeitos.csv"), com uma coluna "motivo".
+    """
+    if caminho_rejeitos is None:
+        caminho_rejeitos = f"{os.path.splitext(caminho)[0]}.rejeitos.csv"
+    relatorio = RelatorioImportacao()
+    inicio = time.perf_counter()
+
+    with open(caminho, newline="", encoding="utf-8") as entrada, \
+            open(caminho_rejeitos, "w", newline="", encoding="utf-8") as saida_rejeitos:
+        leitor = csv.DictReader(entrada)
+        rejeitos = csv.writer(saida_rejeitos)
+        rejeitos.writerow(["linha", *(leitor.fieldnames or ()), "motivo"])
+
+        def rejeitar(numero_linha, linha, motivo):
+            relatorio.rejeitadas += 1
+            rejeitos.writerow([numero_linha, *linha.values(), motivo])
+
+        bloco = []
+        for numero_linha, linha in enumerate(leitor, start=2):
+            relatorio.linhas += 1
+            item, motivo = _item_da_linha(linha)
+            if motivo:
+                rejeitar(numero_linha, linha, motivo)
+                continue
+            bloco.append((numero_linha, linha, item))
+            if len(bloco) >= tamanho_bloco:
+                _aplicar_bloco(bloco, clientes, contas, relatorio, rejeitar)
+                bloco = []
+        if bloco:
+            _aplicar_bloco(bloco, clientes, contas, relatorio, rejeitar)
+
+    relatorio.segundos = time.perf_counter() - inicio
+    return relatorio
+
+
+def _aplicar_bloco(bloco, clientes, contas, relatorio, rejeitar):
+    resultados = processar_lote([item for _, _, item in bloco], clientes, contas)
+    for (numero_linha, linha, _), resultado in zip(bloco, resultados):
+        if resultado == RESULTADO_SUCESSO:
+            relatorio.aplicadas += 1
+        else:
+            rejeitar(numero_linha, linha, resultado)
+
+
+# ============ Modo de Comandos (sem interação) ============
+# Cada linha da entrada é um comando JSON com a mesma letra do menu em "op":
+#   {"op": "nu", "cpf": "123", "nome": "Ana", "data_nascimento": "01-01-1990", "endereco": "..."}
+#   {"op": "nc", "cpf": "123"}
+#   {"op": "d", "cpf": "123", "valor": 100}        (ou "conta": 1 no lugar do CPF)
+#   {"op": "s", "conta": 1, "valor": 50}
+#   {"op": "e", "cpf": "123"}                      (opcionais: "inicio" e "fim" em dd-mm-aaaa,
+#                                                   "tamanho_pagina" e "cursor")
+#   {"op": "lc"}                                   (opcionais: "agencia", "saldo_minimo",
+#                                                   "tamanho_pagina" e "cursor")
+# Valores são em reais, como número ou texto ("1.234,56"); internamente viram centavos.
+# Para cada comando é escrita uma linha JSON com "linha", "op" e "resultado"
+# ("sucesso" ou o motivo da recusa), mais os dados pedidos por "e", "nc" e "lc".
+# "e" e "lc" respondem uma página por vez (no máximo TAMANHO_PAGINA_COMANDO itens),
+# com "proximo_cursor" para pedir a seguinte (null na última): no servidor, um
+# extrato ou cadastro grande não segura o laço de eventos das outras conexões.
+TAMANHO_PAGINA_COMANDO = 1_000
+
+
+def _pagina_comando(comando, padrao):
+    # (tamanho da página, cursor) pedidos no comando, com o tamanho limitado. Cursor
+    # negativo ou página vazia levantam ValueError (linha_invalida): com eles um
+    # cliente que segue os cursores repetiria contas ou pediria a mesma página sempre
+    tamanho_pagina = min(int(comando.get("tamanho_pagina", padrao)), TAMANHO_PAGINA_COMANDO)
+    cursor = int(comando.get("cursor", 0))
+    if tamanho_pagina <= 0 or cursor < 0:
+        raise ValueError(f"página inválida: tamanho {tamanho_pagina}, cursor {cursor}")
+    return tamanho_pagina, cursor
+
+
+def _data_comando(comando, campo):
+    # "dd-mm-aaaa" -> date (ValueError/TypeError viram linha_invalida); ausente -> None
+    texto = comando.get(campo)
+    return None if texto is None else datetime.strptime(texto, "%d-%m-%Y").date()
+
+def _identificador_comando(comando):
+    # Número da conta (inteiro JSON ou texto só com algarismos) ou, sem ele, o CPF.
+    # Outros valores (1.9, true) levantam ValueError, respondido como linha_invalida,
+    # em vez de serem truncados para o número de outra conta
+    conta = comando.get("conta")
+    if conta is None:
+        return str(comando.get("cpf", ""))
+    if isinstance(conta, int) and not isinstance(conta, bool):
+        return conta
+    if isinstance(conta, str) and conta.strip().isdecimal():
+        return int(conta)
+    raise ValueError(f"número de conta inválido: {conta!r}")
+
+
+def _valor_comando(valor):
+    # Valor em reais recebido no JSON -> centavos; None se não for um número finito
+    # que caiba em int64 (o JSON aceita Infinity, NaN e 1e300)
+    if isinstance(valor, str):
+        return converter_valor(valor)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return None
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    centavos = valor * 100 if isinstance(valor, int) else round(valor * 100)
+    return centavos if abs(centavos) <= VALOR_MAXIMO else None
+
+
+def _executar_comando(op, comando, clientes, contas, contas_por_chave=None):
+    # Executa os comandos que não são depósito/saque; retorna o dicionário de resposta
+    if op == "nu":
+        cpf = str(comando.get("cpf", ""))
+        if not cpf:
+            return {"resultado": MOTIVO_LINHA_INVALIDA}
+        cliente = PessoaFisica(
+            nome=comando.get("nome", ""), data_nascimento=comando.get("data_nascimento", ""),
+            cpf=cpf, endereco=comando.get("endereco", ""),
+        )
+        if not clientes.adicionar(cliente):
+            return {"resultado": MOTIVO_CPF_DUPLICADO}
+        return {"resultado": RESULTADO_SUCESSO}
+
+    if op == "nc":
+        cliente = filtrar_cliente(str(comando.get("cpf", "")), clientes)
+        if not cliente:
+            return {"resultado": MOTIVO_CLIENTE_NAO_ENCONTRADO}
+        conta = ContaCorrente.nova_conta(cliente=cliente, numero=alocar_numero_conta(contas), limite=50_000, limite_saques=3)
+        contas.append(conta)
+        cliente.adicionar_conta(conta)
+        return {"resultado": RESULTADO_SUCESSO, "agencia": conta.agencia, "numero": conta.numero}
+
+    if op == "e":
+        identificador = _identificador_comando(comando)
+        if contas_por_chave is None and isinstance(identificador, int):
+            contas_por_chave = _indexar_contas(contas)
+        conta, motivo = _resolver_conta(identificador, clientes, contas, contas_por_chave)
+        if motivo:
+            return {"resultado": motivo}
+        tamanho_pagina, cursor = _pagina_comando(comando, TAMANHO_PAGINA_EXTRATO)
+        historico = conta.historico
+        # Mesmas posições de paginas_extrato: período por busca binária, cursor no Histórico
+        primeiro, ultimo = historico._faixa(
+            _limite_periodo(_data_comando(comando, "inicio")), _limite_periodo(_data_comando(comando, "fim"), fim=True),
+        )
+        primeiro = max(primeiro, cursor)
+        proximo = min(primeiro + tamanho_pagina, ultimo)
+        return {
+            "resultado": RESULTADO_SUCESSO,
+            "saldo": conta.saldo / 100,
+            "transacoes": [
+                {"tipo": transacao["tipo"], "valor": transacao["valor"] / 100, "data": formatar_data(transacao["data"])}
+                for transacao in (RegistroTransacao(historico, indice) for indice in range(primeiro, proximo))
+            ],
+            "proximo_cursor": proximo if proximo < ultimo else None,
+        }
+
+    if op == "lc":
+        saldo_minimo = comando.get("saldo_minimo")
+        if saldo_minimo is not None:
+            saldo_minimo = _valor_comando(saldo_minimo)
+            if saldo_minimo is None:
+                return {"resultado": MOTIVO_VALOR_INVALIDO}
+        tamanho_pagina, cursor = _pagina_comando(comando, TAMANHO_PAGINA_CONTAS)
+        # Uma conta a mais só para descobrir o cursor da página seguinte
+        selecionadas = list(islice(filtrar_contas(contas, cursor, comando.get("agencia"), saldo_minimo), tamanho_pagina + 1))
+        return {
+            "resultado": RESULTADO_SUCESSO,
+            "contas": [
+                {"agencia": conta.agencia, "numero": conta.numero, "titular": conta.cliente.nome, "saldo": conta.saldo / 100}
+                for _, conta in selecionadas[:tamanho_pagina]
+            ],
+            "proximo_cursor": selecionadas[-1][0] if len(selecionadas) > tamanho_pagina else None,
+        }
+
+    return {"resultado": MOTIVO_OPERACAO_INVALIDA}
+
+
+def executar_comandos(entrada, saida, clientes, contas, tamanho_lote=1_000):
+    """
+    Executa um fluxo de comandos JSON (um por linha, veja acima) sem nenhum input(),
+    escrevendo uma resposta JSON por comando em `saida`. Depósitos e saques seguidos
+    são acumulados e aplicados juntos com processar_lote; qualquer outro comando
+    aplica antes o que estiver acumulado, então a ordem de execução é a da entrada.
+    Retorna o número de comandos executados.
+    """
+    pendentes = [] # (número da linha, op, item de processar_lote)
+    executados = 0
+
+    def responder(numero_linha, op, resposta):
+        saida.write(json.dumps({"linha": numero_linha, "op": op, **resposta}, ensure_ascii=False) + "\n")
+
+    def aplicar_pendentes():
+        if not pendentes:
+            return
+        resultados = processar_lote([item for _, _, item in pendentes], clientes, contas)
+        for (numero_linha, op, _), resultado in zip(pendentes, resultados):
+            responder(numero_linha, op, {"resultado": resultado})
+        pendentes.clear()
+
+    for numero_linha, texto in enumerate(entrada, start=1):
+        texto = texto.strip()
+        if not texto or texto.startswith("#"):
+            continue
+        executados += 1
+        try:
+            comando = json.loads(texto)
+            op = comando["op"]
+            if op in ("d", "s"):
+                identificador = _identificador_comando(comando)
+        except (ValueError, KeyError, TypeError):
+            aplicar_pendentes()
+            responder(numero_linha, None, {"resultado": MOTIVO_LINHA_INVALIDA})
+            continue
+
+        if op in ("d", "s"):
+            valor = _valor_comando(comando.get("valor"))
+            if valor is None:
+                aplicar_pendentes()
+                responder(numero_linha, op, {"resultado": MOTIVO_VALOR_INVALIDO})
+                continue
+            pendentes.append((numero_linha, op, (identificador, op, valor)))
+            if len(pendentes) >= tamanho_lote:
+                aplicar_pendentes()
+            continue
+
+        aplicar_pendentes()
+        try:
+            resposta = _executar_comando(op, comando, clientes, contas)
+        except (ValueError, TypeError):
+            resposta = {"resultado": MOTIVO_LINHA_INVALIDA}
+        responder(numero_linha, op, resposta)
+
+    aplicar_pendentes()
+    return executados
+
+
+# ============ Servidor Local (asyncio) ============
+# Expõe os comandos do modo sem interação (mesmo JSON, um por linha) numa conexão
+# TCP local ou num socket Unix, para vários clientes ao mesmo tempo. Cada linha
+# recebida gera uma linha de resposta com "op" e "resultado", na mesma ordem.
+#
+# Toda a execução acontece na thread do laço de eventos: um comando nunca é
+# interrompido no meio, então as alterações de cada conta ficam serializadas sem
+# travas. Depósitos e saques que chegam juntos de várias conexões são aplicados de
+# uma vez com processar_lote na próxima volta do laço; contas diferentes não
+# esperam umas pelas outras, só pela vez no laço.
+class ServidorBanco:
+    def __init__(self, clientes, contas):
+        self.clientes = clientes
+        self.contas = contas
+        self.conexoes_abertas = 0
+        self._pendentes = [] # (item de processar_lote, futuro da resposta)
+        self._contas_indexadas = {}
+        self._total_indexado = 0
+
+    def _contas_por_chave(self):
+        if isinstance(self.contas, IndiceContas):
+            return self.contas # Já mantido a cada conta criada
+        # Indexa só as contas criadas desde a última consulta
+        if self._total_indexado < len(self.contas):
+            self._contas_indexadas.update(_indexar_contas(self.contas[self._total_indexado:]))
+            self._total_indexado = len(self.contas)
+        return self._contas_indexadas
+
+    async def servir(self, host="127.0.0.1", porta=8765, caminho_unix=None):
+        """
+        Atende conexões até receber SIGINT ou SIGTERM. Com `caminho_unix`, escuta
+        num socket Unix em vez de TCP.
+        """
+        laco = asyncio.get_running_loop()
+        parar = asyncio.Event()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                laco.add_signal_handler(sinal, parar.set)
+
+        if caminho_unix:
+            servidor = await asyncio.start_unix_server(self._atender, path=caminho_unix, backlog=4096)
+        else:
+            servidor = await asyncio.start_server(self._atender, host, porta, backlog=4096)
+        endereco = caminho_unix or f"{host}:{porta}"
+        print(f"Servidor ouvindo em {endereco}", flush=True)
+        async with servidor:
+            await parar.wait()
+
+    async def _atender(self, leitor, escritor):
+        self.conexoes_abertas += 1
+        try:
+            while True:
+                try:
+                    linha = await leitor.readline()
+                except ValueError: # Linha maior que o limite do leitor
+                    escritor.write(b'{"op": null, "resultado": "%s"}\n' % MOTIVO_LINHA_INVALIDA.encode())
+                    break
+                if not linha:
+                    break
+                texto = linha.decode("utf-8", "replace").strip()
+                if not texto or texto.startswith("#"):
+                    continue
+                resposta = await self._executar(texto)
+                escritor.write(json.dumps(resposta, ensure_ascii=False).encode() + b"\n")
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.conexoes_abertas -= 1
+            escritor.close()
+            with contextlib.suppress(ConnectionError):
+                await escritor.wait_closed()
+
+    async def _executar(self, texto):
+        try:
+            comando = json.loads(texto)
+            op = comando["op"]
+            if op in ("d", "s"):
+                identificador = _identificador_comando(comando)
+        except (ValueError, KeyError, TypeError):
+            return {"op": None, "resultado": MOTIVO_LINHA_INVALIDA}
+
+        if op in ("d", "s"):
+            valor = _valor_comando(comando.get("valor"))
+            if valor is None:
+                return {"op": op, "resultado": MOTIVO_VALOR_INVALIDO}
+            laco = asyncio.get_running_loop()
+            futuro = laco.create_future()
+            if not self._pendentes:
+                laco.call_soon(self._aplicar_pendentes)
+            self._pendentes.append(((identificador, op, valor), futuro))
+            return {"op": op, "resultado": await futuro}
+
+        try:
+            resposta = _executar_comando(op, comando, self.clientes, self.contas, self._contas_por_chave())
+        except (ValueError, TypeError):
+            resposta = {"resultado": MOTIVO_LINHA_INVALIDA}
+        return {"op": op, **resposta}
+
+    def _aplicar_pendentes(self):
+        pendentes, self._pendentes = self._pendentes, []
+        try:
+            resultados = processar_lote([item for item, _ in pendentes], self.clientes, self.contas,
+                                        self._contas_por_chave())
+        except Exception as erro:
+            for _, futuro in pendentes:
+                if not futuro.done():
+                    futuro.set_exception(erro)
+            return
+        for (_, futuro), resultado in zip(pendentes, resultados):
+            if not futuro.done(): # A conexão pode ter sido fechada enquanto esperava
+                futuro.set_result(resultado)
+
+
+# ============ Motor Fragmentado em Vários Processos ============
+# Um único processo fica preso ao GIL. O motor fragmentado divide as contas entre
+# vários processos (fragmentos) por um hash estável de (agência, número); cada
+# fragmento é dono dos seus objetos Conta/ContaCorrente e Historico e aplica os
+# depósitos e saques deles com processar_lote. Como nenhuma conta é compartilhada
+# entre processos, operações de contas diferentes rodam em paralelo e sem travas.
+# Os fragmentos não gravam o diário: o estado vive só enquanto o motor está aberto.
+def fragmento_da_conta(agencia, numero, fragmentos):
+    # crc32 em vez de hash(): o resultado não muda entre processos nem execuções
+    return zlib.crc32(f"{agencia}:{numero}".encode()) % fragmentos
+
+
+def _executar_fragmento(conexao):
+    """
+    Laço de um processo fragmento. Recebe pela conexão mensagens (tipo, dados):
+    "contas" cria as contas indicadas, "lote" aplica os itens com processar_lote e
+    "saldos" devolve os saldos das contas do fragmento. None encerra o processo.
+    """
+    clientes = ClienteRegistry()
+    contas = IndiceContas()
+
+    while True:
+        mensagem = conexao.recv()
+        if mensagem is None:
+            break
+        tipo, dados = mensagem
+        if tipo == "lote":
+            conexao.send(processar_lote(dados, clientes, contas))
+        elif tipo == "contas":
+            for cpf, nome, numero, limite, limite_saques, limite_transacoes_diarias in dados:
+                if numero in contas:
+                    continue # O roteador já recusa números repetidos; o fragmento não cai por eles
+                cliente = clientes.buscar(cpf)
+                if cliente is None:
+                    cliente = PessoaFisica(nome=nome, data_nascimento="", cpf=cpf, endereco="")
+                    clientes.adicionar(cliente)
+                conta = ContaCorrente.nova_conta(cliente=cliente, numero=numero, limite=limite, limite_saques=limite_saques)
+                conta.limite_transacoes_diarias = limite_transacoes_diarias
+                contas.append(conta)
+                cliente.adicionar_conta(conta)
+            conexao.send(len(dados))
+        elif tipo == "saldos":
+            conexao.send([((conta.agencia, conta.numero), conta.saldo) for conta in contas])
+    conexao.close()
+
+
+class MotorFragmentado:
+    """
+    Roteia depósitos e saques para o processo dono de cada conta.
+
+    Uso:
+        with MotorFragmentado(fragmentos=4) as motor:
+            motor.criar_contas([("12345678900", "Ana", 1)])
+            motor.processar([(("0001", 1), "d", 10_000), (1, "s", 5_000)])
+
+    Os itens de processar() seguem o formato de processar_lote (valores em centavos);
+    o identificador pode ser (agência, número), o número da conta ou o CPF do titular.
+    """
+
+    def __init__(self, fragmentos=None, alocador=None):
+        self.fragmentos = fragmentos or os.cpu_count() or 1
+        self.alocador = alocador or AlocadorNumeros()
+        # spawn: cada fragmento começa com um interpretador limpo, sem herdar
+        # diário, log ou travas do processo que criou o motor
+        contexto = multiprocessing.get_context("spawn")
+        self._conexoes = []
+        self._processos = []
+        for indice in range(self.fragmentos):
+            conexao, conexao_fragmento = contexto.Pipe()
+            processo = contexto.Process(target=_executar_fragmento, args=(conexao_fragmento,),
+                                        name=f"fragmento-{indice}", daemon=True)
+            processo.start()
+            conexao_fragmento.close()
+            self._conexoes.append(conexao)
+            self._processos.append(processo)
+        # Identificador (chave, número ou CPF) -> índice do fragmento, ou o motivo da recusa
+        self._rotas = {}
+
+    def fragmento(self, agencia, numero):
+        return fragmento_da_conta(agencia, numero, self.fragmentos)
+
+    def criar_contas(self, contas, limite=50_000, limite_saques=3, limite_transacoes_diarias=10):
+        """
+        Cria as contas informadas como tuplas (cpf, nome) ou (cpf, nome, número), na
+        agência padrão, cada uma no seu fragmento; sem número, ele vem do alocador.
+        Retorna, para cada conta na ordem de entrada, o número dela ou
+        MOTIVO_CONTA_DUPLICADA se o número já existir no motor.
+        """
+        novas = [[] for _ in range(self.fragmentos)]
+        numeros = []
+        for cpf, nome, *numero in contas:
+            numero = numero[0] if numero else self.alocador.proximo()
+            if numero in self._rotas:
+                numeros.append(MOTIVO_CONTA_DUPLICADA)
+                continue
+            numeros.append(numero)
+            indice = self.fragmento(AGENCIA_PADRAO, numero)
+            novas[indice].append((cpf, nome, numero, limite, limite_saques, limite_transacoes_diarias))
+            self._rotas[(AGENCIA_PADRAO, numero)] = self._rotas[numero] = indice
+            # Como em processar_lote, um CPF só identifica a conta se o cliente tiver apenas uma
+            self._rotas[cpf] = MOTIVO_CONTA_AMBIGUA if cpf in self._rotas else indice
+        self._enviar_a_todos("contas", novas)
+        return numeros
+
+    def processar(self, itens):
+        """
+        Distribui os itens entre os fragmentos e retorna os resultados na ordem de
+        entrada, como processar_lote. Todos os fragmentos trabalham ao mesmo tempo;
+        dentro de cada conta a ordem original é mantida.
+        """
+        resultados = []
+        lotes = [[] for _ in range(self.fragmentos)]
+        posicoes = [[] for _ in range(self.fragmentos)]
+        rotas = self._rotas
+
+        for posicao, item in enumerate(itens):
+            resultados.append(None)
+            identificador, tipo, _ = item
+            if str(tipo).lower() not in _TIPOS_LOTE:
+                resultados[posicao] = MOTIVO_TIPO_INVALIDO
+                continue
+            rota = rotas.get(identificador)
+            if rota is None:
+                rota = MOTIVO_CLIENTE_NAO_ENCONTRADO if isinstance(identificador, str) else MOTIVO_CONTA_NAO_ENCONTRADA
+            if isinstance(rota, str):
+                resultados[posicao] = rota
+                continue
+            lotes[rota].append(item)
+            posicoes[rota].append(posicao)
+
+        for posicoes_fragmento, resultados_fragmento in zip(posicoes, self._enviar_a_todos("lote", lotes)):
+            for posicao, resultado in zip(posicoes_fragmento, resultados_fragmento):
+                resultados[posicao] = resultado
+        return resultados
+
+    def saldos(self):
+        """
+        Retorna um dicionário (agência, número) -> saldo em centavos com as contas de
+        todos os fragmentos.
+        """
+        saldos = {}
+        for saldos_fragmento in self._enviar_a_todos("saldos", [None] * self.fragmentos):
+            saldos.update(saldos_fragmento)
+        return saldos
+
+    def _enviar_a_todos(self, tipo, dados_por_fragmento):
+        # Envia tudo antes de esperar qualquer resposta, para os fragmentos trabalharem juntos
+        for conexao, dados in zip(self._conexoes, dados_por_fragmento):
+            conexao.send((tipo, dados))
+        return [conexao.recv() for conexao in self._conexoes]
+
+    def encerrar(self):
+        for conexao in self._conexoes:
+            try:
+                conexao.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conexao.close()
+        for processo in self._processos:
+            processo.join()
+        self._conexoes = []
+        self._processos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.encerrar()
 
 
 # ============ Funções de Interface do Usuário ============
@@ -334,13 +2646,17 @@ def menu():
 
 
 def filtrar_cliente(cpf, clientes):
-    clientes_filtrados = [cliente for cliente in clientes if cliente.cpf == cpf]
-    return clientes_filtrados[0] if clientes_filtrados else None
+    if isinstance(clientes, ClienteRegistry):
+        return clientes.buscar(cpf)
+    # Mantém o suporte a listas simples de clientes (busca linear)
+    return next((cliente for cliente in clientes if cliente.cpf == cpf), None)
 
 
 def recuperar_conta_cliente(cliente):
+    # Sem conta escolhida, o motivo já fica anotado no log da operação em andamento
     if not cliente.contas:
-        print("\n@@@ Cliente não possui conta! @@@")
+        anotar_log(resultado=MOTIVO_SEM_CONTA)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_SEM_CONTA)} @@@")
         return None
 
     if len(cliente.contas) == 1:
@@ -348,7 +2664,7 @@ def recuperar_conta_cliente(cliente):
     
     print("\nContas do Cliente:")
     for i, conta in enumerate(cliente.contas):
-        print(f"  {i+1}. Agência: {conta.agencia}, C/C: {conta.numero}, Saldo: R$ {conta.saldo:.2f}")
+        print(f"  {i+1}. Agência: {conta.agencia}, C/C: {conta.numero}, Saldo: {formatar_moeda(conta.saldo)}")
     
     while True:
         try:
@@ -359,7 +2675,8 @@ def recuperar_conta_cliente(cliente):
             indice_conta = int(indice_conta_str) - 1
             
             if indice_conta == -1:
-                print("\nOperação cancelada.")
+                anotar_log(resultado=MOTIVO_OPERACAO_CANCELADA)
+                print(f"\n@@@ {mensagem_recusa(MOTIVO_OPERACAO_CANCELADA)} @@@")
                 return None
             if 0 <= indice_conta < len(cliente.contas):
                 return cliente.contas[indice_conta]
@@ -369,88 +2686,139 @@ def recuperar_conta_cliente(cliente):
             print(f"@@@ Entrada inválida: {e}. Por favor, digite um número válido. @@@")
 
 
-@log_transacao
+@log_transacao(campos=("cpf", "conta", "valor", "resultado"))
 def depositar(clientes):
     cpf = input("Informe o CPF do cliente: ")
+    anotar_log(cpf=cpf)
     cliente = filtrar_cliente(cpf, clientes)
 
     if not cliente:
-        print("\n@@@ Cliente não encontrado! @@@")
+        anotar_log(resultado=MOTIVO_CLIENTE_NAO_ENCONTRADO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_CLIENTE_NAO_ENCONTRADO)} @@@")
         return
 
-    valor = float(input("Informe o valor do depósito: "))
+    valor = converter_valor(input("Informe o valor do depósito: "))
+    if valor is None:
+        anotar_log(resultado=MOTIVO_VALOR_INVALIDO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_VALOR_INVALIDO)} @@@")
+        return
+    anotar_log(valor=valor)
     transacao = Deposito(valor)
 
     conta = recuperar_conta_cliente(cliente)
     if not conta:
         return
+    anotar_log(conta=conta.numero)
 
     # A validação de limite diário agora é feita dentro de ContaCorrente.depositar
-    # ou ContaCorrente.sacar, e Cliente.realizar_transacao verifica o retorno.
-    cliente.realizar_transacao(conta, transacao)
+    # ou ContaCorrente.sacar, e Cliente.realizar_transacao devolve o Resultado.
+    resultado = cliente.realizar_transacao(conta, transacao)
+    exibir_resultado(resultado)
+    anotar_log(resultado=resultado.codigo)
 
 
-@log_transacao
+@log_transacao(campos=("cpf", "conta", "valor", "resultado"))
 def sacar(clientes):
     cpf = input("Informe o CPF do cliente: ")
+    anotar_log(cpf=cpf)
     cliente = filtrar_cliente(cpf, clientes)
 
     if not cliente:
-        print("\n@@@ Cliente não encontrado! @@@")
+        anotar_log(resultado=MOTIVO_CLIENTE_NAO_ENCONTRADO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_CLIENTE_NAO_ENCONTRADO)} @@@")
         return
 
-    valor = float(input("Informe o valor do saque: "))
+    valor = converter_valor(input("Informe o valor do saque: "))
+    if valor is None:
+        anotar_log(resultado=MOTIVO_VALOR_INVALIDO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_VALOR_INVALIDO)} @@@")
+        return
+    anotar_log(valor=valor)
     transacao = Saque(valor)
 
     conta = recuperar_conta_cliente(cliente)
     if not conta:
         return
+    anotar_log(conta=conta.numero)
 
     # A validação de limite diário agora é feita dentro de ContaCorrente.sacar
-    cliente.realizar_transacao(conta, transacao)
+    resultado = cliente.realizar_transacao(conta, transacao)
+    exibir_resultado(resultado)
+    anotar_log(resultado=resultado.codigo)
 
 
-@log_transacao
+def ler_periodo():
+    """
+    Pergunta o período do extrato. Retorna (inicio, fim) como date, com None para
+    um lado sem limite, ou None se a entrada for inválida.
+    """
+    partes = input("Período (dd-mm-aaaa [dd-mm-aaaa], Enter para todo o histórico): ").split()
+    if len(partes) > 2:
+        return None
+    try:
+        datas = [datetime.strptime(parte, "%d-%m-%Y").date() for parte in partes]
+    except ValueError:
+        return None
+    datas += [None] * (2 - len(datas))
+    return datas[0], datas[1]
+
+
+@log_transacao(campos=("cpf", "conta", "resultado"))
 def exibir_extrato(clientes):
     cpf = input("Informe o CPF do cliente: ")
+    anotar_log(cpf=cpf)
     cliente = filtrar_cliente(cpf, clientes)
 
     if not cliente:
-        print("\n@@@ Cliente não encontrado! @@@")
+        anotar_log(resultado=MOTIVO_CLIENTE_NAO_ENCONTRADO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_CLIENTE_NAO_ENCONTRADO)} @@@")
         return
 
     conta = recuperar_conta_cliente(cliente)
     if not conta:
         return
+    anotar_log(conta=conta.numero)
+
+    periodo = ler_periodo()
+    if periodo is None:
+        anotar_log(resultado=MOTIVO_PERIODO_INVALIDO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_PERIODO_INVALIDO)} @@@")
+        return
+    inicio, fim = periodo
 
     print("\n================ EXTRATO ================")
-    extrato_str = "" # Usado para construir a string do extrato
+    if inicio or fim:
+        print(f"Período: {inicio.strftime('%d-%m-%Y') if inicio else 'início'} a {fim.strftime('%d-%m-%Y') if fim else 'hoje'}")
+    if inicio:
+        print(f"\nSaldo inicial:\n\t{formatar_moeda(conta.historico.saldo_em(inicio))}")
     tem_transacao = False
-    
-    # Gerar relatório para exibir todas as transações, incluindo data e hora
-    for transacao in conta.historico.gerar_relatorio():
+
+    # Cada página é formatada e escrita de uma vez, sem montar o extrato inteiro
+    for pagina in paginas_extrato(conta.historico, inicio=inicio, fim=fim):
         tem_transacao = True
-        extrato_str += (
-            f"\n{transacao['tipo']}:\n"
-            f"\tR$ {transacao['valor']:.2f}\n"
-            f"\tData: {transacao['data']}\n" # Adiciona a data/hora aqui
-        )
+        sys.stdout.write(str(pagina))
+        if pagina.proximo_cursor is not None:
+            if input("\n[Enter] próxima página | [q] encerrar extrato: ").strip().lower() == "q":
+                break
 
     if not tem_transacao:
-        extrato_str = "Não foram realizadas movimentações."
-
-    print(extrato_str)
-    print(f"\nSaldo:\n\tR$ {conta.saldo:.2f}")
+        print("Não foram realizadas movimentações." if not (inicio or fim) else "Não houve movimentações no período.")
+    if fim:
+        print(f"\nSaldo ao fim do período:\n\t{formatar_moeda(conta.historico.saldo_em(fim + timedelta(days=1)))}")
+    print(f"\nSaldo:\n\t{formatar_moeda(conta.saldo)}")
     print("==========================================")
+    anotar_log(resultado=RESULTADO_SUCESSO)
 
 
-@log_transacao
+@log_transacao(campos=("cpf", "resultado"))
 def criar_cliente(clientes):
     cpf = input("Informe o CPF (somente número): ")
+    anotar_log(cpf=cpf)
     cliente = filtrar_cliente(cpf, clientes)
 
     if cliente:
-        print("\n@@@ Já existe cliente com esse CPF! @@@")
+        anotar_log(resultado=MOTIVO_CPF_DUPLICADO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_CPF_DUPLICADO)} @@@")
         return
 
     nome = input("Informe o nome completo: ")
@@ -459,47 +2827,101 @@ def criar_cliente(clientes):
 
     cliente = PessoaFisica(nome=nome, data_nascimento=data_nascimento, cpf=cpf, endereco=endereco)
 
-    clientes.append(cliente)
+    if isinstance(clientes, ClienteRegistry):
+        clientes.adicionar(cliente)
+    else:
+        clientes.append(cliente)
 
-    print("\n=== Cliente criado com sucesso! ===")
+    resultado = Resultado(OPERACAO_NOVO_CLIENTE)
+    exibir_resultado(resultado)
+    anotar_log(resultado=resultado.codigo)
 
 
-@log_transacao
+@log_transacao(campos=("cpf", "numero_conta", "resultado"))
 def criar_conta(numero_conta, clientes, contas):
+    # Com numero_conta None, o número vem do alocador, só depois de validar o cliente
     cpf = input("Informe o CPF do cliente: ")
+    anotar_log(cpf=cpf)
     cliente = filtrar_cliente(cpf, clientes)
 
     if not cliente:
-        print("\n@@@ Cliente não encontrado, fluxo de criação de conta encerrado! @@@")
+        anotar_log(resultado=MOTIVO_CLIENTE_NAO_ENCONTRADO)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_CLIENTE_NAO_ENCONTRADO)} @@@")
+        return
+
+    if numero_conta is None:
+        numero_conta = alocar_numero_conta(contas)
+        anotar_log(numero_conta=numero_conta)
+
+    if numero_conta in contas:
+        anotar_log(resultado=MOTIVO_CONTA_DUPLICADA)
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_CONTA_DUPLICADA)} @@@")
         return
 
     # Adiciona a nova conta à lista de contas do cliente
-    # e à lista global de contas
-    conta = ContaCorrente.nova_conta(cliente=cliente, numero=numero_conta, limite=500, limite_saques=3) # Usando limite_saques=3 para o desafio (saques diários)
+    # e ao índice global de contas, que a deixa acessível por (agência, número)
+    conta = ContaCorrente.nova_conta(cliente=cliente, numero=numero_conta, limite=50_000, limite_saques=3) # Usando limite_saques=3 para o desafio (saques diários)
     
+    contas.append(conta) # Adiciona ao índice global
     cliente.adicionar_conta(conta) # Adiciona ao cliente
-    contas.append(conta) # Adiciona à lista global
 
-    print("\n=== Conta criada com sucesso! ===")
+    resultado = Resultado(OPERACAO_NOVA_CONTA, conta=conta)
+    exibir_resultado(resultado)
+    anotar_log(resultado=resultado.codigo)
 
 
 def listar_contas(contas):
     if not contas:
         print("\n@@@ Nenhuma conta cadastrada ainda. @@@")
         return
-        
+
+    agencia = input("Filtrar por agência (Enter para todas): ").strip() or None
+    texto_saldo = input("Saldo mínimo (Enter para nenhum): ").strip()
+    saldo_minimo = converter_valor(texto_saldo) if texto_saldo else None
+    if texto_saldo and saldo_minimo is None:
+        print(f"\n@@@ {mensagem_recusa(MOTIVO_VALOR_INVALIDO)} @@@")
+        return
+
     print("\n================ LISTA DE CONTAS ================")
-    # Utilizando o iterador personalizado para listar as contas
-    # e o textwrap para formatar cada string retornada pelo iterador
-    for conta_info in ContasIterador(contas):
-        print(textwrap.dedent(conta_info))
-        print("-" * 50)
+    tem_conta = False
+    # Cada página vai para a saída numa única escrita
+    for pagina in paginas_contas(contas, agencia=agencia, saldo_minimo=saldo_minimo):
+        tem_conta = True
+        sys.stdout.write(str(pagina))
+        if pagina.proximo_cursor is not None:
+            if input("[Enter] próxima página | [q] encerrar listagem: ").strip().lower() == "q":
+                break
+    if not tem_conta:
+        print("Nenhuma conta atende aos filtros.")
     print("==========================================")
 
 
+def carregar_estado():
+    # Opcional: históricos em arquivos de razão mapeados em memória (veja FabricaHistoricoMapeado)
+    if os.environ.get("BANCO_RAZAO"):
+        configurar_historico(FabricaHistoricoMapeado(os.environ["BANCO_RAZAO"]))
+
+    # Estado persistido em disco (veja DiarioBancario); a pasta é configurável por BANCO_DADOS
+    pasta = os.environ.get("BANCO_DADOS", "dados_banco")
+    diario, clientes, contas = DiarioBancario.recuperar(pasta)
+    configurar_diario(diario)
+    # Números de conta reservados ficam registrados na mesma pasta
+    configurar_alocador(AlocadorNumeros(
+        os.path.join(pasta, "numeros_conta"), minimo=max((conta.numero for conta in contas), default=0) + 1,
+    ))
+    return diario, clientes, contas
+
+
+def encerrar_estado(diario):
+    encerrar_log() # Grava as entradas de log pendentes antes de sair
+    if _alocador_ativo is not None:
+        _alocador_ativo.devolver_sobra()
+    diario.gravar_snapshot() # Compacta o estado para a próxima inicialização
+    diario.fechar()
+
+
 def main():
-    clientes = []
-    contas = []
+    diario, clientes, contas = carregar_estado()
 
     while True:
         opcao = menu()
@@ -517,19 +2939,71 @@ def main():
             criar_cliente(clientes)
 
         elif opcao == "nc":
-            numero_conta = len(contas) + 1
-            criar_conta(numero_conta, clientes, contas)
+            criar_conta(None, clientes, contas)
 
         elif opcao == "lc":
             listar_contas(contas)
 
         elif opcao == "q":
+            encerrar_estado(diario)
             print("\nSaindo do sistema. Obrigado por usar nosso banco!")
             break
 
         else:
-            print("\n@@@ Operação inválida, por favor selecione novamente a operação desejada. @@@")
+            print(f"\n@@@ {mensagem_recusa(MOTIVO_OPERACAO_INVALIDA)} Selecione novamente a operação desejada. @@@")
+
+
+def main_importacao(caminho, caminho_rejeitos=None):
+    diario, clientes, contas = carregar_estado()
+    try:
+        relatorio = importar_csv(caminho, clientes, contas, caminho_rejeitos)
+    finally:
+        encerrar_estado(diario)
+    print(relatorio)
+
+
+def main_comandos(caminho_comandos, caminho_saida=None):
+    diario, clientes, contas = carregar_estado()
+    entrada = sys.stdin if caminho_comandos == "-" else open(caminho_comandos, encoding="utf-8")
+    saida = sys.stdout if caminho_saida in (None, "-") else open(caminho_saida, "w", encoding="utf-8")
+    try:
+        executar_comandos(entrada, saida, clientes, contas)
+    finally:
+        saida.flush()
+        for arquivo in (entrada, saida):
+            if arquivo not in (sys.stdin, sys.stdout):
+                arquivo.close()
+        encerrar_estado(diario)
+
+
+def main_servidor(host="127.0.0.1", porta=8765, caminho_unix=None):
+    diario, clientes, contas = carregar_estado()
+    try:
+        asyncio.run(ServidorBanco(clientes, contas).servir(host, porta, caminho_unix))
+    finally:
+        encerrar_estado(diario)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sistema bancário (sem argumentos, abre o menu interativo).")
+    parser.add_argument("--importar", metavar="CSV", help="importa depósitos e saques de um arquivo CSV")
+    parser.add_argument("--rejeitos", metavar="CSV", help="arquivo para as linhas recusadas na importação")
+    parser.add_argument("--comandos", metavar="ARQUIVO",
+                        help="executa comandos JSON (um por linha) sem interação; '-' lê da entrada padrão")
+    parser.add_argument("--saida", metavar="ARQUIVO", help="destino das respostas do modo --comandos (padrão: saída padrão)")
+    parser.add_argument("--servidor", action="store_true", help="atende os comandos JSON por TCP local ou socket Unix")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço do --servidor (padrão: 127.0.0.1)")
+    parser.add_argument("--porta", type=int, default=8765, help="porta TCP do --servidor (padrão: 8765)")
+    parser.add_argument("--unix", metavar="CAMINHO", help="socket Unix do --servidor, no lugar de TCP")
+    argumentos = parser.parse_args()
+
+    if argumentos.servidor:
+        main_servidor(argumentos.host, argumentos.porta, argumentos.unix)
+    elif argumentos.comandos:
+        main_comandos(argumentos.comandos, argumentos.saida)
+    elif argumentos.importar:
+        main_importacao(argumentos.importar, argumentos.rejeitos)
+    else:
+        main()
\ No newline at end of file